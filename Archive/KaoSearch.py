@@ -1,22 +1,21 @@
 import pandas as pd
 import streamlit as st
-from scipy.spatial import KDTree
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ev_data import load_stations
+from ev_search import ZipIndex, load_station_index, search_results
 
 # 读取数据
 file_path = "ev_stations_v1.csv"  # 替换为你的数据文件路径
-df = pd.read_csv(file_path)
-
-# 选择需要的字段
-df_filtered = df[['ZIP', 'City', 'State', 'Station Name', 'Street Address', 'EV Level1 EVSE Num', 'EV Level2 EVSE Num', 'EV DC Fast Count', 'EV Network']]
-
-# 去除 ZIP 为空的行
-df_filtered = df_filtered.dropna(subset=['ZIP'])
+df = load_stations(file_path)
 
-# 转换 ZIP 为字符串（防止前导零丢失）
-df_filtered['ZIP'] = df_filtered['ZIP'].astype(str)
+# ZIP 已由 load_stations 规范为整数，按 ZIP 建立行索引（O(1) 查询）
+zip_index = ZipIndex.from_frame(df)
 
-# 获取唯一的 ZIP 列表
-unique_zips = df_filtered[['ZIP']].drop_duplicates()
+# 建立球面距离索引（站点坐标 + ZIP 中心点）
+station_index = load_station_index(file_path, df)
 
 # 创建 Streamlit 应用
 st.title("EV 充电站查询")
@@ -26,36 +25,29 @@ zip_code = st.text_input("输入邮政编码 (ZIP Code)", "")
 
 if zip_code:
     # 查找匹配的城市和州
-    location_info = df_filtered[df_filtered['ZIP'] == zip_code][['City', 'State']].drop_duplicates()
+    zip_rows = zip_index.rows_for(zip_code)
     
-    if not location_info.empty:
-        city, state = location_info.iloc[0]
+    if len(zip_rows):
+        city, state = df.iloc[zip_rows[0]][['City', 'State']]
         st.write(f"邮政编码 {zip_code} 属于 {city}, {state}。")
         
         # 查找该 ZIP 代码下的所有充电站
-        stations = df_filtered[df_filtered['ZIP'] == zip_code]
+        stations = search_results(df, zip_rows)
         
         if not stations.empty:
             st.write("相关充电站信息：")
             st.dataframe(stations)
         else:
             st.write("该邮政编码内未找到充电站信息。")
-            
-            # 提供附近邮编的充电站信息
-            zip_list = df_filtered[['ZIP']].drop_duplicates().values.flatten()
-            zip_tree = KDTree(zip_list.reshape(-1, 1).astype(float))
-            
-            try:
-                nearest_idx = zip_tree.query([[float(zip_code)]], k=5)[1][0]
-                nearby_zips = zip_list[nearest_idx]
-                nearby_stations = df_filtered[df_filtered['ZIP'].isin(nearby_zips)]
-                
-                if not nearby_stations.empty:
-                    st.write("附近邮政编码的充电站信息：")
-                    st.dataframe(nearby_stations)
-                else:
-                    st.write("附近区域也未找到充电站信息。")
-            except:
-                st.write("无法找到相近的邮政编码。")
+
+        # 提供最近的充电站信息（按实际距离，英里）
+        distances, rows = station_index.nearest_to_zip(zip_code, k=10)
+        nearby_stations = search_results(df, rows, distances)
+
+        if not nearby_stations.empty:
+            st.write("最近的充电站信息：")
+            st.dataframe(nearby_stations)
+        else:
+            st.write("附近区域也未找到充电站信息。")
     else:
         st.write("未找到该邮政编码的相关信息。")
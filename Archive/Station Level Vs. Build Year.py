@@ -1,15 +1,17 @@
 import pandas as pd
 import matplotlib.pyplot as plt
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ev_data import load_stations
 
 # 读取数据
 file_path = "ev_stations_v1.csv"  # 替换为你的数据文件路径
-df = pd.read_csv(file_path)
-
-# 过滤掉没有 Open Date 的数据
-df_open_date = df.dropna(subset=["Open Date"])
+df = load_stations(file_path)
 
-# 转换 Open Date 为年份
-df_open_date["Open Year"] = pd.to_datetime(df_open_date["Open Date"], errors="coerce").dt.year
+# 过滤掉没有 Open Year 的数据（Open Year 由 load_stations 解析）
+df_open_date = df.dropna(subset=["Open Year"])
 
 # 排除 2022 年数据
 df_open_date = df_open_date[df_open_date["Open Year"] != 2022]
@@ -3,45 +3,42 @@ import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
 from dash import Dash, dcc, html, Input, Output
-from mpl_toolkits.basemap import Basemap
 import io
 import base64
 import numpy as nppip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ev_data import load_stations
+from ev_coords import load_coordinates
+from ev_maps import StationMap
 
 # Load dataset
 file_path = "E:\Learn\OSU\DataIO\ev_stations_v1.csv"
-df = pd.read_csv(file_path)
-
-# Convert Longitude to numeric (fix mixed types issue)
-df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+df = load_stations(file_path)  # Longitude mixed types are fixed by the loader
 
-# Drop rows with missing location data
-df_clean = df.dropna(subset=['Latitude', 'Longitude'])
+# Stations with a location, projected once per map extent
+coords = load_coordinates(file_path, df)
+stations = StationMap(coords)
 
 # Define color mapping based on charger type
+# (Charger Type and Access Type are derived by the loader)
 color_mapping = {
     "Level 1": "red",
     "Level 2": "blue",
     "DC Fast": "green"
 }
 
-# Classify station types based on available charger counts
-def classify_charger(row):
-    if row["EV DC Fast Count"] > 0:
-        return "DC Fast"
-    elif row["EV Level2 EVSE Num"] > 0:
-        return "Level 2"
-    elif row["EV Level1 EVSE Num"] > 0:
-        return "Level 1"
-    return "Unknown"
-
-df_clean["Charger Type"] = df_clean.apply(classify_charger, axis=1)
-
-# Classify stations as public or private
-df_clean["Access Type"] = df_clean["Groups With Access Code"].apply(lambda x: "Public" if x == "Public" else "Private")
+# One scatter layer per charger type and access type
+# (all stations are drawn, no sampling needed)
+styles = {}
+for charger, color in color_mapping.items():
+    styles[f"{charger} (Public)"] = dict(s=5, color=color, alpha=0.7, marker='o')
+    styles[f"{charger} (Private)"] = dict(s=10, color=color, alpha=0.7, marker='*')
 
-# Sample the dataset for faster rendering
-df_sampled = df_clean.sample(frac=0.1, random_state=42)
+def layer(level, access):
+    return f"{level} ({access})"
 
 # State abbreviations with approximate central coordinates
 state_labels = {
@@ -63,30 +60,12 @@ state_labels = {
 # Create figure and axis
 fig, ax_main = plt.subplots(figsize=(12, 8))
 
-# Define the main USA map
-m_main = Basemap(
-    projection='merc',
-    llcrnrlat=20, urcrnrlat=50,  # Latitude range (Mainland USA)
-    llcrnrlon=-125, urcrnrlon=-65,  # Longitude range (Mainland USA)
-    resolution='l', ax=ax_main
-)
-
-# Draw main USA map details
-m_main.drawcoastlines()
-m_main.drawcountries()
-m_main.drawstates()
-m_main.fillcontinents(color='lightgray', lake_color='white')
+# Main USA map (Mainland USA, cached background)
+m_main = stations.background(ax_main, "conus_wide", style="plain")
 
 # Plot charger locations
-df_sampled["x_main"], df_sampled["y_main"] = m_main(df_sampled["Longitude"].values, df_sampled["Latitude"].values)
-
-for charger, color in color_mapping.items():
-    subset_public = df_sampled[(df_sampled["Charger Type"] == charger) & (df_sampled["Access Type"] == "Public")]
-    subset_private = df_sampled[(df_sampled["Charger Type"] == charger) & (df_sampled["Access Type"] == "Private")]
+stations.scatter(ax_main, "conus_wide", ["level", "access"], layer, styles)
 
-    ax_main.scatter(subset_public["x_main"], subset_public["y_main"], s=5, color=color, alpha=0.7, marker='o')
-    ax_main.scatter(subset_private["x_main"], subset_private["y_main"], s=10, color=color, alpha=0.7, marker='*')
-    
 # Add state abbreviations (excluding AK and HI in the mainland)
 for state, (lat, lon) in state_labels.items():
     x, y = m_main(lon, lat)
@@ -96,58 +75,16 @@ for state, (lat, lon) in state_labels.items():
 ax_alaska = fig.add_axes([0.104, 0.106, 0.22, 0.22])  # Bottom-left
 ax_hawaii = fig.add_axes([0.264, 0.106, 0.15,0.15])  # Below Alaska
 
-# Define the Alaska map
-m_alaska = Basemap(
-    projection='merc',
-    llcrnrlat=50, urcrnrlat=72,
-    llcrnrlon=-170, urcrnrlon=-130,
-    resolution='l', ax=ax_alaska
-)
-
-m_alaska.drawcoastlines()
-m_alaska.drawcountries()
-m_alaska.drawstates()
-m_alaska.fillcontinents(color='lightgray', lake_color='white')
-
-# Filter Alaska data
-df_alaska = df_sampled[(df_sampled["Latitude"] > 50) & (df_sampled["Longitude"] < -130)]
-df_alaska["x_alaska"], df_alaska["y_alaska"] = m_alaska(df_alaska["Longitude"].values, df_alaska["Latitude"].values)
-
-# Plot Alaska charging stations
-for charger, color in color_mapping.items():
-    subset_public = df_alaska[df_alaska["Charger Type"] == charger][df_alaska["Access Type"] == "Public"]
-    subset_private = df_alaska[df_alaska["Charger Type"] == charger][df_alaska["Access Type"] == "Private"]
-
-    ax_alaska.scatter(subset_public["x_alaska"], subset_public["y_alaska"], s=5, color=color, alpha=0.7, marker='o')
-    ax_alaska.scatter(subset_private["x_alaska"], subset_private["y_alaska"], s=10, color=color, alpha=0.7, marker='*')
+# Alaska map and charging stations
+m_alaska = stations.background(ax_alaska, "alaska", style="plain", width=400)
+stations.scatter(ax_alaska, "alaska", ["level", "access"], layer, styles)
 
 x_ak, y_ak = m_alaska(-152.0, 63.5)
 ax_alaska.text(x_ak, y_ak, "AK", fontsize=10, fontweight='bold', ha='center', va='center', color='black')
 
-# Define the Hawaii map
-m_hawaii = Basemap(
-    projection='merc',
-    llcrnrlat=18, urcrnrlat=22,
-    llcrnrlon=-161, urcrnrlon=-154,
-    resolution='l', ax=ax_hawaii
-)
-
-m_hawaii.drawcoastlines()
-m_hawaii.drawcountries()
-m_hawaii.drawstates()
-m_hawaii.fillcontinents(color='lightgray', lake_color='white')
-
-# Filter Hawaii data
-df_hawaii = df_sampled[(df_sampled["Latitude"] < 23) & (df_sampled["Longitude"] < -150)]
-df_hawaii["x_hawaii"], df_hawaii["y_hawaii"] = m_hawaii(df_hawaii["Longitude"].values, df_hawaii["Latitude"].values)
-
-# Plot Hawaii charging stations
-for charger, color in color_mapping.items():
-    subset_public = df_hawaii[df_hawaii["Charger Type"] == charger][df_hawaii["Access Type"] == "Public"]
-    subset_private = df_hawaii[df_hawaii["Charger Type"] == charger][df_hawaii["Access Type"] == "Private"]
-
-    ax_hawaii.scatter(subset_public["x_hawaii"], subset_public["y_hawaii"], s=5, color=color, alpha=0.7, marker='o')
-    ax_hawaii.scatter(subset_private["x_hawaii"], subset_private["y_hawaii"], s=10, color=color, alpha=0.7, marker='*')
+# Hawaii map and charging stations
+m_hawaii = stations.background(ax_hawaii, "hawaii", style="plain", width=400)
+stations.scatter(ax_hawaii, "hawaii", ["level", "access"], layer, styles)
 
 x_hi, y_hi = m_hawaii(-157.5, 20)
 ax_hawaii.text(x_hi,y_hi, "HI", fontsize=10, fontweight='bold', ha='center', va='center', color='black')
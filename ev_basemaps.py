@@ -0,0 +1,123 @@
+'''
+Cached Basemap projections and pre-rendered map backgrounds.
+
+Building a Basemap and drawing coastlines, countries, states and continents
+is the slow part of every map figure, and it never changes between runs. Each
+named extent is built once and pickled to .ev_cache/basemaps/, and each
+(extent, style, width) background is rendered once to a PNG there. Map
+figures show the PNG with imshow and composite their point layers on top,
+using the cached projection for the coordinates.
+'''
+
+import copy
+import functools
+import os
+import pickle
+
+from ev_data import cache_dir
+from ev_trace import traced
+
+# (llcrnrlat, urcrnrlat, llcrnrlon, urcrnrlon). Such a tuple can also be
+# passed directly as an extent, e.g. for a per-state map.
+EXTENTS = {
+    "conus": (24, 50, -125, -66),
+    "conus_wide": (20, 50, -125, -65),
+    "alaska": (50, 72, -170, -130),
+    "hawaii": (18, 22, -161, -154),
+}
+
+STYLES = {
+    "dark": {"continents": "#666666", "lakes": "lightblue", "ocean": "lightblue"},
+    "light": {"continents": "lightgray", "lakes": "lightblue", "ocean": "lightblue"},
+    "plain": {"continents": "lightgray", "lakes": "white", "ocean": None},
+}
+
+
+def _extent_bounds(extent):
+    # A named extent or a (llcrnrlat, urcrnrlat, llcrnrlon, urcrnrlon) tuple
+    return EXTENTS[extent] if isinstance(extent, str) else tuple(extent)
+
+
+def _extent_name(extent):
+    return extent if isinstance(extent, str) else "_".join(f"{value:g}" for value in extent)
+
+
+def _cache_file(name):
+    basemap_dir = os.path.join(cache_dir(), "basemaps")
+    os.makedirs(basemap_dir, exist_ok=True)
+    return os.path.join(basemap_dir, name)
+
+
+@functools.lru_cache(maxsize=None)
+@traced()
+def get_basemap(extent):
+    # Projection for a named extent, from memory, disk, or built once
+    from mpl_toolkits.basemap import Basemap, __version__
+
+    target = _cache_file(f"{_extent_name(extent)}.{__version__}.pickle")
+    if os.path.exists(target):
+        with open(target, "rb") as f:
+            return pickle.load(f)
+
+    llcrnrlat, urcrnrlat, llcrnrlon, urcrnrlon = _extent_bounds(extent)
+    m = Basemap(projection="merc", llcrnrlat=llcrnrlat, urcrnrlat=urcrnrlat,
+                llcrnrlon=llcrnrlon, urcrnrlon=urcrnrlon, resolution="l")
+    # Per-process temporary name: report workers may build the same extent
+    tmp = f"{target}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(m, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+    return m
+
+
+def _bounds(m):
+    return (m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry)
+
+
+@functools.lru_cache(maxsize=None)
+@traced()
+def get_background(extent, style="light", width=1600):
+    # RGBA image of the drawn map layers, from memory, disk, or rendered once
+    import matplotlib.image as mpimg
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    target = _cache_file(f"{_extent_name(extent)}.{style}.{width}.png")
+    if not os.path.exists(target):
+        # Drawing leaves artists (e.g. the map boundary) on the Basemap, so
+        # render with a copy to keep the shared projection clean
+        m = copy.copy(get_basemap(extent))
+        x0, x1, y0, y1 = _bounds(m)
+        height = max(1, round(width * (y1 - y0) / (x1 - x0)))
+        colors = STYLES[style]
+
+        fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+        FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1])
+        ax.axis("off")
+        if colors["ocean"] is not None:
+            m.drawmapboundary(fill_color=colors["ocean"], ax=ax)
+        m.fillcontinents(color=colors["continents"], lake_color=colors["lakes"], ax=ax)
+        m.drawcoastlines(ax=ax)
+        m.drawcountries(ax=ax)
+        m.drawstates(ax=ax)
+        ax.set_xlim(x0, x1)
+        ax.set_ylim(y0, y1)
+        tmp = f"{target}.{os.getpid()}.tmp.png"
+        fig.savefig(tmp, dpi=100, transparent=colors["ocean"] is None)
+        os.replace(tmp, target)
+    return mpimg.imread(target)
+
+
+def draw_background(ax, extent="conus", style="light", width=1600):
+    # Paint the cached background into ax and return the projection for the
+    # point layers: x, y = m(lons, lats); ax.scatter(x, y, ...)
+    m = get_basemap(extent)
+    bounds = _bounds(m)
+    ax.imshow(get_background(extent, style, width), extent=bounds, origin="upper",
+              interpolation="antialiased", zorder=0)
+    ax.set_xlim(bounds[0], bounds[1])
+    ax.set_ylim(bounds[2], bounds[3])
+    ax.set_xticks([])
+    ax.set_yticks([])
+    return m
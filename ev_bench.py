@@ -0,0 +1,265 @@
+'''
+Benchmark suite for the station pipeline.
+
+Runs every stage on synthetic exports (see ev_synth.py) of growing size and
+reports the wall time and peak memory of each:
+
+    stream      chunked aggregation of the CSV (ev_stream), with --stream-mb only
+    load        CSV parse (pandas reader with the text column dtypes)
+    clean       schema coercion: ZIPs, junk numbers, categories
+    classify    charger level, access type and open date columns
+    county      ZIP3 lookup plus the polygon join where a boundary file exists
+    aggregate   cube build and the roll-ups behind the charts
+    zip_search  ZipIndex build plus the ZIP lookups of the search app
+    nearest     coordinate store, StationIndex build plus nearest-to-ZIP queries
+    map         density map of the contiguous US on a cached background
+
+--imports also times a cold import of every entry module in a fresh
+interpreter and lists the heavy libraries each one pulls in, so plotting or
+geospatial imports creeping into the search path show up as a regression.
+
+Stages are measured with ev_trace: peak memory is the resident set
+high-water mark during the stage (Linux). Elsewhere it falls back to
+tracemalloc, which only sees allocations made through Python and numpy.
+Caches are not used, every size is a cold run.
+
+Results are appended as JSON lines, one per (rows, stage). --trace writes the
+full trace, with the functions traced inside each stage. Passing a previous
+results file as --baseline flags the stages that got slower or bigger than
+the tolerance and exits with status 1, e.g. in CI:
+
+    python ev_bench.py --sizes 10000 100000 --out bench.jsonl
+    python ev_bench.py --sizes 10000 100000 --baseline bench.jsonl
+    python ev_bench.py --imports --sizes
+
+--stream-mb also checks the stream stage against its memory budget: a peak
+over the budget plus the tolerance fails the run the same way.
+
+    python ev_bench.py --sizes 300000 --stream-mb 32
+'''
+
+import argparse
+import gc
+import io
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ev_data import (CACHE_DIR, COUNTY_BOUNDARIES, _csv_dtypes, add_county_column, add_derived_columns, apply_schema,
+                     boundary_path)
+from ev_synth import write_stations_csv
+from ev_trace import TRACER, can_measure_rss, stage
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+WARMUP_ROWS = 2000
+DATA_DIR = os.path.join(CACHE_DIR, "bench")
+MAP_EXTENT = "conus"
+
+# Entry modules: data loading, analysis, maps, search, figures and the CLIs
+ENTRY_MODULES = ["ev_data", "ev_cube", "ev_search", "ev_maps", "ev_figures", "ev_report", "ev_refresh", "ev_stream"]
+HEAVY_MODULES = ["scipy", "matplotlib", "mpl_toolkits.basemap", "geopandas", "shapely", "seaborn", "streamlit"]
+
+
+# Stages
+
+def _query_zips(df, queries, seed=0):
+    zips = df["ZIP"].dropna().unique().to_numpy(dtype="int64")
+    return np.random.default_rng(seed).choice(zips, min(queries, len(zips)), replace=False)
+
+
+def _layer_colors():
+    from ev_raster import darker
+
+    colors = {"Level 1": "red", "Level 2": "blue", "DC Fast": "green"}
+    return {f"{level} ({access})": shade for level, color in colors.items()
+            for access, shade in (("Public", color), ("Private", darker(color)))}
+
+
+def run_pipeline(path, queries=200, rows=None, stream_mb=None):
+    # Every stage once over the CSV at path, cold
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from ev_basemaps import get_background
+    from ev_coords import CoordinateStore
+    from ev_cube import StationCube
+    from ev_maps import StationMap
+    from ev_search import StationIndex, ZipIndex, search_results, zip3_centroids, zip_centroids
+    from ev_stream import stream_aggregates
+
+    # Absolute boundary paths: the bench CSVs live under .ev_cache/, and the
+    # polygon join must run as it does for the real export
+    boundaries = {state: boundary_path(boundary) for state, boundary in COUNTY_BOUNDARIES.items()}
+    if stream_mb:
+        # First, so it does not reuse memory the later stages freed
+        with stage("stream", rows, budget_mb=stream_mb):
+            stream_aggregates(path, stream_mb)
+    with stage("load", rows):
+        df = pd.read_csv(path, dtype=_csv_dtypes(path), low_memory=False)
+    with stage("clean", rows):
+        df = apply_schema(df)
+    with stage("classify", rows):
+        df = add_derived_columns(df)
+    with stage("county", rows):
+        df = add_county_column(df, path, use_cache=False, boundaries=boundaries)
+
+    with stage("aggregate", rows):
+        cube = StationCube.from_frame(df)
+        cube.counts("State")
+        cube.counts("EV Network")
+        cube.openings(freq="Y")
+        cube.ratios("State", "Owner Type Code")
+        df["City"].value_counts()
+        df["County"].value_counts()
+
+    zips = _query_zips(df, queries)
+    with stage("zip_search", rows):
+        zip_index = ZipIndex.from_frame(df)
+        for zip_code in zips:
+            search_results(df, zip_index.rows_for(int(zip_code)))
+
+    with stage("nearest", rows):
+        coords = CoordinateStore.from_frame(df)
+        station_index = StationIndex(coords.lat, coords.lon, coords.rows, zip_centroids(df), zip3_centroids(df))
+        for zip_code in zips:
+            station_index.nearest_to_zip(int(zip_code), k=10)
+
+    get_background(MAP_EXTENT, "plain", 1200)  # Built once per checkout, not per run
+    with stage("map", rows):
+        fig = Figure(figsize=(12, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        stations = StationMap(coords)
+        stations.background(ax, MAP_EXTENT, style="plain", width=1200)
+        stations.density(ax, MAP_EXTENT, ["level", "access"], lambda level, access: f"{level} ({access})",
+                         _layer_colors(), width=1200)
+        fig.savefig(io.BytesIO(), format="png", dpi=100)
+
+
+def synthetic_csv(rows, seed=0, data_dir=DATA_DIR):
+    # Generated once per (rows, seed) and kept for later runs
+    os.makedirs(data_dir, exist_ok=True)
+    target = os.path.join(data_dir, f"synthetic_{rows}_{seed}.csv")
+    if not os.path.exists(target):
+        write_stations_csv(target + ".tmp", rows, seed)
+        os.replace(target + ".tmp", target)
+    return target
+
+
+def run_benchmarks(sizes=SIZES, seed=0, queries=200, data_dir=DATA_DIR, stream_mb=None, log=print):
+    # Top-level stage events per size. A small unmeasured run goes first, so
+    # imports, font caches and first-call setup do not land on the smallest
+    # size.
+    if not sizes:
+        return []
+    TRACER.enable(use_tracemalloc=not can_measure_rss())
+    run_pipeline(synthetic_csv(WARMUP_ROWS, seed, data_dir), queries, stream_mb=stream_mb)
+    TRACER.clear()
+    memory = "stage_mb" if TRACER.rss else "traced_mb"
+    results = []
+    for rows in sizes:
+        path = synthetic_csv(rows, seed, data_dir)
+        gc.collect()
+        done = len(TRACER.events)
+        run_pipeline(path, queries, rows, stream_mb)
+        for event in TRACER.events[done:]:
+            if event["depth"] == 0:
+                results.append(event)
+                log(f"{rows:>10}  {event['name']:<11} {event['wall_s']:>9.3f} s  "
+                    f"{event['cpu_s']:>9.3f} s cpu  {event[memory]:>+9.1f} MB")
+    return results
+
+
+# Imports
+
+def import_time(module):
+    # (seconds, heavy libraries loaded) for importing module in a fresh
+    # interpreter, from the cumulative -X importtime figure
+    script = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    done = subprocess.run([sys.executable, "-X", "importtime", "-c", script], capture_output=True, text=True,
+                          check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    lines = [line for line in done.stderr.splitlines() if line.startswith("import time:")]
+    seconds = next(int(line.split("|")[1]) for line in reversed(lines) if line.split("|")[2].strip() == module) / 1e6
+    return seconds, done.stdout.split()
+
+
+def import_times(modules=ENTRY_MODULES, repeat=3, log=print):
+    # Best of repeat runs, so a cold page cache on the first one does not count
+    results = []
+    for module in modules:
+        timings = [import_time(module) for _ in range(repeat)]
+        seconds, heavy = min(timings)
+        results.append({"name": f"import {module}", "wall_s": round(seconds, 4), "loads": heavy})
+        log(f"{'import':>10}  {module:<11} {seconds:>9.3f} s  {' '.join(heavy)}")
+    return results
+
+
+# Baselines
+
+def read_results(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def regressions(results, baseline, tolerance=0.25):
+    # (rows, stage, metric, baseline value, new value) for every stage that
+    # got worse than baseline * (1 + tolerance). Memory uses the rise over the
+    # stage start, so the footprint of earlier stages does not count.
+    previous = {(result.get("rows"), result["name"]): result for result in baseline}
+    worse = []
+    for result in results:
+        before = previous.get((result.get("rows"), result["name"]))
+        if before is None:
+            continue
+        for metric in ("wall_s", "stage_mb", "traced_mb"):
+            if metric not in result or metric not in before:
+                continue
+            if result[metric] > max(before[metric], 0) * (1 + tolerance) and result[metric] - before[metric] > 0.01:
+                worse.append((result.get("rows"), result["name"], metric, before[metric], result[metric]))
+    return worse
+
+
+def over_budget(results, tolerance=0.25):
+    # (rows, stage, peak, budget) for every stage with a memory budget (see
+    # stream_mb) that peaked above budget * (1 + tolerance)
+    over = []
+    for result in results:
+        peak = result.get("stage_mb", result.get("traced_mb"))
+        if "budget_mb" in result and peak is not None and peak > result["budget_mb"] * (1 + tolerance):
+            over.append((result.get("rows"), result["name"], peak, result["budget_mb"]))
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the station pipeline on synthetic exports of growing size")
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES, help="Row counts (default: 10k to 10M)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=200, help="ZIP and nearest-station queries per size")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Where the synthetic CSVs are kept")
+    parser.add_argument("--out", help="Append the results to this JSON lines file")
+    parser.add_argument("--baseline", help="Results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown / growth (default: 0.25)")
+    parser.add_argument("--imports", action="store_true", help="Also time a cold import of every entry module")
+    parser.add_argument("--trace", help="Write the full trace to this file (.json: Chrome trace, else JSON lines)")
+    parser.add_argument("--stream-mb", type=int, help="Also stream each CSV within this memory budget and check it")
+    args = parser.parse_args()
+
+    results = import_times() if args.imports else []
+    results += run_benchmarks(args.sizes, args.seed, args.queries, args.data_dir, args.stream_mb)
+    if args.out:
+        with open(args.out, "a") as f:
+            f.writelines(json.dumps(result) + "\n" for result in results)
+    if args.trace:
+        TRACER.export(args.trace)
+
+    over = over_budget(results, args.tolerance)
+    for rows, name, peak, budget in over:
+        print(f"OVER BUDGET {name} at {rows} rows: {peak} MB > {budget} MB")
+    worse = regressions(results, read_results(args.baseline), args.tolerance) if args.baseline else []
+    for rows, name, metric, before, after in worse:
+        print(f"REGRESSION {name}{f' at {rows} rows' if rows else ''}: {metric} {before} -> {after}")
+    raise SystemExit(1 if over or worse else 0)
@@ -0,0 +1,138 @@
+'''
+Memory-mapped coordinate store for the map layers.
+
+Stations with valid coordinates are written once per dataset version as plain
+.npy files in .ev_cache/: float32 longitude/latitude and aligned int32 code
+arrays (row in the station table, charger level, access, network). Loading
+maps the files read-only, so every map, spatial index and process (report,
+search app) shares the same pages instead of holding its own copy.
+'''
+
+import json
+import os
+
+import numpy as np
+
+from ev_data import ACCESS_TYPES, CHARGER_TYPES, CSV_PATH, cache_path, load_stations, prune_cache
+from ev_trace import traced
+
+CODE_FIELDS = ["row", "Charger Type", "Access Type", "EV Network"]
+
+
+class CoordinateStore:
+    def __init__(self, lonlat, codes, labels):
+        # lonlat: (2, n) float32, codes: (4, n) int32, labels: {field: [names]}
+        self.lonlat = lonlat
+        self.codes = codes
+        self.labels = labels
+
+    def __len__(self):
+        return self.lonlat.shape[1]
+
+    @property
+    def lon(self):
+        return self.lonlat[0]
+
+    @property
+    def lat(self):
+        return self.lonlat[1]
+
+    @property
+    def rows(self):
+        return self.codes[0]
+
+    @property
+    def level(self):
+        return self.codes[1]
+
+    @property
+    def access(self):
+        return self.codes[2]
+
+    @property
+    def network(self):
+        return self.codes[3]
+
+    @classmethod
+    @traced()
+    def from_frame(cls, df):
+        valid = (df["Latitude"].notna() & df["Longitude"].notna()).to_numpy()
+        rows = np.flatnonzero(valid)
+        lonlat = np.vstack([
+            df["Longitude"].to_numpy(dtype="float32")[valid],
+            df["Latitude"].to_numpy(dtype="float32")[valid],
+        ])
+        network = df["EV Network"].astype("category")
+        codes = np.vstack([
+            rows,
+            df["Charger Type"].cat.codes.to_numpy()[valid],
+            df["Access Type"].cat.codes.to_numpy()[valid],
+            network.cat.codes.to_numpy()[valid],
+        ]).astype(np.int32)
+        labels = {
+            "Charger Type": list(CHARGER_TYPES),
+            "Access Type": list(ACCESS_TYPES),
+            "EV Network": [str(name) for name in network.cat.categories],
+        }
+        return cls(np.ascontiguousarray(lonlat), codes, labels)
+
+    def code(self, field, label):
+        return self.labels[field].index(label) if label in self.labels[field] else -2
+
+    def where(self, **labels):
+        # Boolean mask by label, e.g. where(level="DC Fast", access="Public").
+        # A list of labels matches any of them.
+        fields = {"level": 1, "access": 2, "network": 3}
+        mask = np.ones(len(self), dtype=bool)
+        for key, wanted in labels.items():
+            field = CODE_FIELDS[fields[key]]
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            mask &= np.isin(self.codes[fields[key]], [self.code(field, label) for label in wanted])
+        return mask
+
+    def within(self, lat_min=-90, lat_max=90, lon_min=-180, lon_max=180):
+        return (self.lat > lat_min) & (self.lat < lat_max) & (self.lon > lon_min) & (self.lon < lon_max)
+
+    def subset(self, mask):
+        # Store over the masked stations only (copies the selected rows)
+        return CoordinateStore(self.lonlat[:, mask], self.codes[:, mask], self.labels)
+
+    # Persistence
+
+    def save(self, path=CSV_PATH):
+        targets = _targets(path)
+        with open(targets["labels"] + ".tmp", "w") as f:
+            json.dump(self.labels, f)
+        np.save(targets["lonlat"] + ".tmp.npy", self.lonlat)
+        np.save(targets["codes"] + ".tmp.npy", self.codes)
+        os.replace(targets["labels"] + ".tmp", targets["labels"])
+        os.replace(targets["lonlat"] + ".tmp.npy", targets["lonlat"])
+        os.replace(targets["codes"] + ".tmp.npy", targets["codes"])
+        for name, target in targets.items():
+            prune_cache(path, f"coord_{name}", keep=target)
+
+    @classmethod
+    def load(cls, path=CSV_PATH):
+        targets = _targets(path)
+        if not all(os.path.exists(target) for target in targets.values()):
+            return None
+        with open(targets["labels"]) as f:
+            labels = json.load(f)
+        return cls(np.load(targets["lonlat"], mmap_mode="r"), np.load(targets["codes"], mmap_mode="r"), labels)
+
+
+def _targets(path):
+    return {
+        "lonlat": cache_path(path, "coord_lonlat", ".npy"),
+        "codes": cache_path(path, "coord_codes", ".npy"),
+        "labels": cache_path(path, "coord_labels", ".json"),
+    }
+
+
+@traced()
+def load_coordinates(path=CSV_PATH, df=None):
+    store = CoordinateStore.load(path)
+    if store is None:
+        CoordinateStore.from_frame(load_stations(path) if df is None else df).save(path)
+        store = CoordinateStore.load(path)
+    return store
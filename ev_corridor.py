@@ -0,0 +1,199 @@
+'''
+Corridor search: stations within a distance of a route.
+
+A route is a polyline of (lat, lon) vertices, e.g. a highway trip with
+thousands of points. Segments longer than the search radius are split along
+their great circle first, then consecutive segments are grouped into runs
+about one radius long. Each run gets a covering ball on the station KD-tree
+(3-D unit vectors, as in ev_search), so one vectorized ball query over the
+runs prunes the stations to the few near the route. A second, small KD-tree
+over the route's own vertices then narrows each of those stations down to
+the segments around its nearest vertex, and only those (segment, station)
+pairs get the exact distance to the great-circle arc. Each station keeps its
+closest segment, which gives the distance off the route and the distance
+along it to the point where the station is closest.
+
+Filters (charger level, access, network; see CoordinateStore.where) pick the
+stations before the search, with one KD-tree per filter built on first use
+and kept, so a batch of routes, or later batches, reuse the same index:
+
+    corridor = load_corridor_index()
+    corridor.query(route, 5, level="DC Fast", access="Public")      # miles
+    corridor.query_many(routes, 8, units="km", network=["Tesla", "Electrify America"])
+'''
+
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from ev_coords import load_coordinates
+from ev_data import CSV_PATH
+from ev_search import EARTH_RADIUS, unit_vectors
+from ev_trace import traced
+
+CHUNK_SEGMENTS = 4096  # Segments per ball query, bounds the candidate pairs held at once
+RUN_KM = 10  # Shortest run of segments per pruning ball
+
+
+# Route geometry
+
+def _angle(u, v):
+    # Central angle between unit vectors, accurate at any size
+    return np.arctan2(np.linalg.norm(np.cross(u, v), axis=-1), np.einsum("ij,ij->i", u, v))
+
+
+def _chord(angle):
+    return 2 * np.sin(np.minimum(angle, np.pi) / 2)
+
+
+def _slerp(starts, ends, angles, t):
+    # Points a fraction t of the way along each great-circle arc
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = np.sin((1 - t) * angles) / np.sin(angles)
+        b = np.sin(t * angles) / np.sin(angles)
+    return np.where((angles > 0)[:, None], a[:, None] * starts + b[:, None] * ends, starts)
+
+
+def route_segments(route, max_angle):
+    # (starts, ends, along) of the route's great-circle segments as unit
+    # vectors, with the angle along the route at each start. Segments longer
+    # than max_angle are split into equal pieces of the same great circle.
+    route = np.asarray(route, dtype="float64").reshape(-1, 2)
+    if not len(route):
+        raise ValueError("a route needs at least one (lat, lon) vertex")
+    points = unit_vectors(route[:, 0], route[:, 1])
+    if len(points) == 1:
+        points = np.vstack([points, points])
+    angles = _angle(points[:-1], points[1:])
+    pieces = np.maximum(np.ceil(angles / max_angle), 1).astype(np.int64)
+    if (pieces > 1).any():
+        segment = np.repeat(np.arange(len(angles)), pieces)
+        step = np.arange(len(segment)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        inner = _slerp(points[:-1][segment], points[1:][segment], angles[segment], step / pieces[segment])
+        points = np.vstack([inner, points[-1:]])
+        angles = _angle(points[:-1], points[1:])
+    return points[:-1], points[1:], np.cumsum(angles) - angles
+
+
+def arc_distances(points, starts, ends):
+    # (off, along) angles from each point to the arc between its start and
+    # end: the cross-track angle where the foot of the point falls on the
+    # arc, else the angle to the nearer end. along is measured from start.
+    normals = np.cross(starts, ends)
+    norms = np.linalg.norm(normals, axis=1)
+    proper = norms > 1e-12
+    normals = normals / np.where(proper, norms, 1)[:, None]
+    height = np.einsum("ij,ij->i", points, normals)
+    feet = points - height[:, None] * normals
+    inside = (proper & (np.einsum("ij,ij->i", np.cross(starts, feet), normals) >= 0)
+              & (np.einsum("ij,ij->i", np.cross(feet, ends), normals) >= 0))
+
+    to_start, to_end = _angle(points, starts), _angle(points, ends)
+    off = np.where(inside, np.abs(np.arcsin(np.clip(height, -1, 1))), np.minimum(to_start, to_end))
+    with np.errstate(invalid="ignore"):
+        along = np.where(inside, _angle(starts, feet), np.where(to_start <= to_end, 0, _angle(starts, ends)))
+    return off, along
+
+
+# Queries
+
+class CorridorIndex:
+    def __init__(self, coords):
+        self.coords = coords
+        self._subsets = {}
+
+    def _subset(self, labels):
+        # (KD-tree, coordinate positions) of the stations matching labels
+        from scipy.spatial import cKDTree
+
+        key = tuple(sorted((name, value if isinstance(value, str) else tuple(value))
+                           for name, value in labels.items()))
+        if key not in self._subsets:
+            positions = np.flatnonzero(self.coords.where(**labels)) if labels else np.arange(len(self.coords))
+            tree = cKDTree(unit_vectors(self.coords.lat[positions], self.coords.lon[positions]))
+            self._subsets[key] = (tree, positions)
+        return self._subsets[key]
+
+    def query(self, route, radius, units="mi", **labels):
+        # Stations within radius of the route, an (n, 2) sequence of (lat, lon)
+        # vertices, as a DataFrame of table rows with their distance along and
+        # off the route, ordered along it. labels: level, access, network.
+        return self.query_many([route], radius, units, **labels).drop(columns="route")
+
+    @traced()
+    def query_many(self, routes, radius, units="mi", **labels):
+        # query() for every route, with a route column (its index in routes)
+        tree, positions = self._subset({name: value for name, value in labels.items() if value is not None})
+        reach = radius / EARTH_RADIUS[units]
+        span = max(reach, RUN_KM / EARTH_RADIUS["km"])
+        parts = []
+        for route_id, route in enumerate(routes):
+            starts, ends, along = route_segments(route, span)
+            found = [_candidates(tree, starts[first:first + CHUNK_SEGMENTS], ends[first:first + CHUNK_SEGMENTS],
+                                 along[first:first + CHUNK_SEGMENTS], reach, span)
+                     for first in range(0, len(starts), CHUNK_SEGMENTS)]
+            station, off, at = _closest(*(np.concatenate(values) for values in zip(*found)))
+            parts.append(pd.DataFrame({
+                "route": np.full(len(station), route_id),
+                "row": self.coords.rows[positions[station]],
+                "along": at * EARTH_RADIUS[units],
+                "off": off * EARTH_RADIUS[units],
+            }))
+        result = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["route", "row", "along", "off"])
+        return result.sort_values(["route", "along"], kind="stable", ignore_index=True)
+
+
+def _candidates(tree, starts, ends, along, reach, span):
+    # (tree positions, off angle, along angle) of the stations within reach
+    # of the segments, closest segment per station
+    from scipy.spatial import cKDTree
+
+    # Runs of segments about span long share one ball, centred on the run's
+    # middle vertex and reaching the path length to its farther end plus
+    # reach; the route never leaves that ball, so no station in range is
+    # pruned
+    angles = _angle(starts, ends)
+    run = np.floor((along - along[0]) / span).astype(np.int64)
+    first = np.flatnonzero(np.diff(run, prepend=-1) != 0)
+    last = np.append(first[1:], len(run)) - 1
+    middle = (first + last) // 2
+    extent = np.maximum(along[middle] - along[first], along[last] + angles[last] - along[middle])
+    found = tree.query_ball_point(starts[middle], _chord(extent + reach) * (1 + 1e-9), return_sorted=False)
+    stations = np.unique(np.fromiter(chain.from_iterable(found), dtype=np.int64))
+    if not len(stations):
+        return stations, np.empty(0), np.empty(0)
+
+    # The closest point of the route is at most half a segment from an end of
+    # its segment, and no farther than the nearest vertex, so only segments
+    # with an end within (distance to the nearest vertex + half the longest
+    # segment) need the exact test
+    points = tree.data[stations]
+    vertices = cKDTree(np.vstack([starts, ends[-1:]]))
+    nearest, _ = vertices.query(points)
+    radius = _chord(2 * np.arcsin(np.minimum(nearest / 2, 1)) + angles.max() / 2) * (1 + 1e-9)
+    near = vertices.query_ball_point(points, radius, return_sorted=False)
+    counts = np.fromiter(map(len, near), dtype=np.int64, count=len(near))
+    vertex = np.fromiter(chain.from_iterable(near), dtype=np.int64, count=counts.sum())
+    station = np.repeat(stations, counts)
+    # Vertex i ends segment i - 1 and starts segment i
+    segment = np.concatenate([vertex - 1, vertex])
+    station = np.concatenate([station, station])
+    valid = (segment >= 0) & (segment < len(starts))
+    segment, station = segment[valid], station[valid]
+
+    off, at = arc_distances(tree.data[station], starts[segment], ends[segment])
+    keep = off <= reach
+    return _closest(station[keep], off[keep], at[keep] + along[segment[keep]])
+
+
+def _closest(station, off, at):
+    # One entry per station, its smallest off (then along) angle
+    order = np.lexsort((at, off, station))
+    first = order[np.flatnonzero(np.diff(station[order], prepend=-1) != 0)]
+    return station[first], off[first], at[first]
+
+
+@traced()
+def load_corridor_index(path=CSV_PATH, df=None):
+    return CorridorIndex(load_coordinates(path, df))
@@ -0,0 +1,285 @@
+'''
+Sparse aggregation cube over the station table.
+
+One pass over the loaded table groups the stations by
+State x EV Network x Owner Type Code x Charger Type x Access Type x Open Quarter
+and keeps only the cells that hold stations: their codes per dimension plus
+the station count and EVSE sums per level of each. The full cross product is
+mostly empty and would be many times the size of the table. Every bar chart,
+crosstab and trend line in ev_stations.py is then a roll-up of these cells
+(one bincount over the kept dimensions) instead of a new group-by over the
+DataFrame.
+
+Each dimension keeps one extra trailing code for missing values, so totals
+still include stations with e.g. no Owner Type Code or Open Date.
+
+The cells are cached per dataset version as plain .npy files in the narrowest
+integer types that hold them. Loading maps them read-only, like the
+coordinate store, so report workers share the same pages.
+'''
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ev_data import CSV_PATH, NO_DAY, cache_path, load_stations, open_days, prune_cache
+from ev_trace import traced
+
+DIMS = ["State", "EV Network", "Owner Type Code", "Charger Type", "Access Type", "Open Quarter"]
+EVSE_COLUMNS = ["EV Level1 EVSE Num", "EV Level2 EVSE Num", "EV DC Fast Count"]
+MEASURES = ["count"] + EVSE_COLUMNS
+
+OWNER_GROUPS = {"FG": "Public", "SG": "Public", "LG": "Public", "T": "Public", "P": "Private", "J": "PPP"}
+
+
+def _narrow(values):
+    # Smallest integer type that holds every value
+    values = np.asarray(values, dtype=np.int64)
+    if not values.size:
+        return values.astype(np.int8)
+    return values.astype(np.result_type(np.min_scalar_type(values.min()), np.min_scalar_type(values.max())))
+
+
+def _category_codes(series):
+    cat = series.astype("category")
+    labels = pd.Index(cat.cat.categories)
+    codes = cat.cat.codes.to_numpy().astype(np.int64)
+    codes[codes < 0] = len(labels)
+    return codes, labels
+
+
+def _quarter_span(*indexes):
+    indexes = [index for index in indexes if len(index)]
+    if not indexes:
+        return pd.PeriodIndex([], freq="Q")
+    return pd.period_range(min(index[0] for index in indexes), max(index[-1] for index in indexes), freq="Q")
+
+
+def _union_labels(dim, left, right):
+    # Labels of one dimension over two cubes: quarters stay a contiguous
+    # range, the rest keep their order when equal and are sorted otherwise
+    if dim == "Open Quarter":
+        return _quarter_span(left, right)
+    return left.union(right)
+
+
+def _quarter_codes(days):
+    # Open Day numbers to quarter codes, straight from the integer days
+    valid = days != NO_DAY
+    months = np.where(valid, days, 0).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    ordinal = np.where(valid, (months + 1970 * 12) // 3, 0)
+    if not valid.any():
+        return np.zeros(len(days), dtype=np.int64), pd.PeriodIndex([], freq="Q")
+    first, last = ordinal[valid].min(), ordinal[valid].max()
+    labels = pd.period_range(pd.Period(year=first // 4, quarter=first % 4 + 1, freq="Q"),
+                             pd.Period(year=last // 4, quarter=last % 4 + 1, freq="Q"), freq="Q")
+    codes = np.where(valid, ordinal - first, len(labels)).astype(np.int64)
+    return codes, labels
+
+
+class StationCube:
+    def __init__(self, labels, cells, measures):
+        # labels: {dim: Index of known values}; cells: (dims, n) codes of the
+        # non-empty cells, len(labels[dim]) when missing; measures: {name:
+        # (n,) sums per cell}. A cell may appear more than once (e.g. after
+        # relabel); roll-ups add them up.
+        self.labels = labels
+        self.cells = cells
+        self.measures = measures
+        self.dims = list(labels)
+
+    def __len__(self):
+        return self.cells.shape[1]
+
+    @property
+    def shape(self):
+        return tuple(len(self.labels[dim]) + 1 for dim in self.dims)
+
+    @classmethod
+    @traced()
+    def from_frame(cls, df):
+        codes, labels = [], {}
+        for dim in DIMS:
+            if dim == "Open Quarter":
+                dim_codes, dim_labels = _quarter_codes(open_days(df))
+            else:
+                dim_codes, dim_labels = _category_codes(df[dim])
+            codes.append(dim_codes)
+            labels[dim] = dim_labels
+
+        shape = tuple(len(labels[dim]) + 1 for dim in DIMS)
+        weights = {"count": np.ones(len(df))}
+        weights.update({column: df[column].to_numpy(dtype="float64", na_value=0) for column in EVSE_COLUMNS})
+        return cls.grouped(labels, np.ravel_multi_index(codes, shape), weights)
+
+    @classmethod
+    def grouped(cls, labels, flat, weights):
+        # Cube over the distinct flat cell indexes (raveled over the labels'
+        # shape), with each measure's weights summed per cell
+        shape = tuple(len(values) + 1 for values in labels.values())
+        cells, inverse = np.unique(flat, return_inverse=True)
+        measures = {name: _narrow(np.bincount(inverse, weights=values, minlength=len(cells)))
+                    for name, values in weights.items()}
+        return cls(labels, _narrow(np.unravel_index(cells, shape)), measures)
+
+    def consolidate(self):
+        # Same cube with every cell once and cells that add up to zero (see
+        # subtract) dropped
+        flat = np.ravel_multi_index(self.cells, self.shape)
+        cube = StationCube.grouped(self.labels, flat, {name: np.asarray(values, dtype="float64")
+                                                       for name, values in self.measures.items()})
+        keep = np.any([values != 0 for values in cube.measures.values()], axis=0)
+        measures = {name: values[keep] for name, values in cube.measures.items()}
+        return StationCube(self.labels, cube.cells[:, keep], measures)
+
+    # Persistence
+
+    def save(self, path=CSV_PATH):
+        targets = _targets(path)
+        meta = {"measures": list(self.measures),
+                "labels": {dim: [str(label) for label in values] for dim, values in self.labels.items()}}
+        with open(targets["labels"] + ".tmp", "w") as f:
+            json.dump(meta, f)
+        np.save(targets["cells"] + ".tmp.npy", self.cells)
+        np.save(targets["measures"] + ".tmp.npy", _narrow(np.stack(list(self.measures.values()))))
+        os.replace(targets["labels"] + ".tmp", targets["labels"])
+        os.replace(targets["cells"] + ".tmp.npy", targets["cells"])
+        os.replace(targets["measures"] + ".tmp.npy", targets["measures"])
+        for name, target in targets.items():
+            prune_cache(path, f"cube_{name}", keep=target)
+        prune_cache(path, "cube", keep=None)  # The old dense .npz cube
+
+    @classmethod
+    def load(cls, path=CSV_PATH, version=None):
+        # Cube of one version of the CSV (default: the current one), None
+        # when it is not cached
+        targets = _targets(path, version)
+        if not all(os.path.exists(target) for target in targets.values()):
+            return None
+        with open(targets["labels"]) as f:
+            meta = json.load(f)
+        labels = {dim: pd.PeriodIndex(values, freq="Q") if dim == "Open Quarter" else pd.Index(values, dtype=object)
+                  for dim, values in meta["labels"].items()}
+        measures = np.load(targets["measures"], mmap_mode="r")
+        return cls(labels, np.load(targets["cells"], mmap_mode="r"), dict(zip(meta["measures"], measures)))
+
+    def merge(self, other):
+        # Cubes built from different chunks have different label sets, so both
+        # are recoded into the union of labels
+        labels = {dim: _union_labels(dim, self.labels[dim], other.labels[dim]) for dim in self.dims}
+
+        cells = []
+        for cube in (self, other):
+            tables = [np.append(labels[dim].get_indexer(cube.labels[dim]), len(labels[dim])) for dim in self.dims]
+            cells.append(np.stack([table[codes] for table, codes in zip(tables, cube.cells)]))
+        measures = {name: np.concatenate([np.asarray(self.measures[name], dtype=np.int64),
+                                          np.asarray(other.measures[name], dtype=np.int64)])
+                    for name in self.measures}
+        return StationCube(labels, np.concatenate(cells, axis=1), measures).consolidate()
+
+    def subtract(self, other):
+        # Take the stations counted in other back out, e.g. rows that were
+        # removed or changed in a new export
+        negated = {name: -np.asarray(values, dtype=np.int64) for name, values in other.measures.items()}
+        return self.merge(StationCube(other.labels, other.cells, negated))
+
+    # Slicing
+
+    def where(self, dim, values):
+        # Keep only the given labels along one dimension (copies those cells)
+        axis = self.dims.index(dim)
+        known = self.labels[dim]
+        keep = known.get_indexer(pd.Index(values))
+        keep = keep[keep >= 0]
+        table = np.full(len(known) + 1, -1, dtype=np.int64)  # The missing slot is dropped
+        table[keep] = np.arange(len(keep))
+        codes = table[self.cells[axis]]
+        selected = np.flatnonzero(codes >= 0)
+        cells = np.array(self.cells[:, selected], dtype=np.int64)
+        cells[axis] = codes[selected]
+        labels = dict(self.labels)
+        labels[dim] = known[keep]
+        measures = {name: np.asarray(values[selected]) for name, values in self.measures.items()}
+        return StationCube(labels, cells, measures)
+
+    def relabel(self, dim, mapping):
+        # Merge labels along one dimension, e.g. owner codes into Public/Private/PPP.
+        # Labels missing from the mapping fall into the missing slot.
+        axis = self.dims.index(dim)
+        known = self.labels[dim]
+        targets = pd.Index(sorted(set(mapping.values())))
+        table = np.array([targets.get_loc(mapping[label]) if label in mapping else len(targets)
+                          for label in known] + [len(targets)])
+        cells = np.array(self.cells, dtype=np.int64)
+        cells[axis] = table[cells[axis]]
+        labels = dict(self.labels)
+        labels[dim] = targets
+        return StationCube(labels, cells, self.measures)
+
+    # Roll-ups
+
+    def total(self, measure="count"):
+        return int(np.sum(self.measures[measure], dtype=np.int64))
+
+    def rollup(self, *dims, measure="count", dropna=True):
+        # Sum out every dimension not listed. One dim gives a Series, two give
+        # a DataFrame (rows, columns), more give a Series with a MultiIndex.
+        shape = tuple(len(self.labels[dim]) + 1 for dim in dims)
+        flat = np.ravel_multi_index([self.cells[self.dims.index(dim)] for dim in dims], shape)
+        weights = np.asarray(self.measures[measure], dtype="float64")
+        values = np.bincount(flat, weights=weights, minlength=int(np.prod(shape))).astype(np.int64).reshape(shape)
+        if dropna:
+            values = values[tuple(slice(0, -1) for _ in dims)]
+            indexes = [self.labels[dim] for dim in dims]
+        else:
+            indexes = [self.labels[dim].append(pd.Index([None])) for dim in dims]
+
+        if len(dims) == 1:
+            return pd.Series(values, index=indexes[0].rename(dims[0]), name=measure)
+        if len(dims) == 2:
+            return pd.DataFrame(values, index=indexes[0].rename(dims[0]), columns=indexes[1].rename(dims[1]))
+        index = pd.MultiIndex.from_product(indexes, names=list(dims))
+        return pd.Series(values.ravel(), index=index, name=measure)
+
+    def counts(self, dim, measure="count"):
+        # Like value_counts: sorted descending, zero rows dropped
+        series = self.rollup(dim, measure=measure)
+        return series[series > 0].sort_values(ascending=False, kind="stable")
+
+    def openings(self, measure="count", freq="Q"):
+        # Openings per quarter ("Q") or year ("Y"), periods with no new
+        # station dropped like value_counts would
+        series = self.rollup("Open Quarter", measure=measure)
+        opened = self.rollup("Open Quarter")
+        if freq != "Q":
+            series = series.groupby(series.index.asfreq(freq)).sum()
+            opened = opened.groupby(opened.index.asfreq(freq)).sum()
+        return series[opened > 0]
+
+    def ratios(self, rows, columns, measure="count", sort_by=None):
+        # Row-normalized crosstab, optionally sorted by one column's share
+        table = self.rollup(rows, columns, measure=measure)
+        table = table[table.sum(axis=1) > 0]
+        table = table.div(table.sum(axis=1), axis=0)
+        if sort_by is not None:
+            table = table.sort_values(by=sort_by, ascending=False)
+        return table
+
+
+def _targets(path, version=None):
+    return {
+        "cells": cache_path(path, "cube_cells", ".npy", version),
+        "measures": cache_path(path, "cube_measures", ".npy", version),
+        "labels": cache_path(path, "cube_labels", ".json", version),
+    }
+
+
+@traced()
+def load_cube(path=CSV_PATH, df=None):
+    cube = StationCube.load(path)
+    if cube is None:
+        StationCube.from_frame(load_stations(path) if df is None else df).save(path)
+        cube = StationCube.load(path)
+    return cube
@@ -0,0 +1,468 @@
+'''
+Data loading for the EV Charging Stations dataset (DataI/O 2025, team KFC).
+
+The first load of ev_stations_v1.csv parses the CSV once and writes an
+uncompressed Feather (Arrow IPC) copy into .ev_cache/ next to the CSV. Later
+loads memory-map that file instead of re-parsing the CSV. The cache is keyed
+on the size, mtime and content hash of the source CSV, so a new AFDC export
+rebuilds it.
+
+Derived columns (Charger Type, Access Type, Open Day/Date/Year) are computed
+once, vectorized, and cached in the same table. Open Date is parsed once with
+the export's fixed format into integer day numbers (Open Day); the datetime
+and year columns are derived from those. County comes from a point-in-polygon
+join against the boundary files in COUNTY_BOUNDARIES (see ev_regions.py),
+cached separately so a new boundary file does not invalidate the table, and
+from the national ZIP3 reference table (zip3_counties.csv) elsewhere. County
+labels carry the state ("Orange, CA") so same-named counties stay apart.
+'''
+
+import functools
+import hashlib
+import itertools
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from ev_trace import traced
+
+CSV_PATH = "ev_stations_v1.csv"
+CACHE_DIR = ".ev_cache"
+CACHE_FORMAT = 6  # Bump whenever the cached table layout changes
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # No pyarrow: fall back to parsing the CSV every time
+    feather = None
+
+
+# Source File Fingerprint
+
+def _hash_file(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_dir(path=CSV_PATH):
+    # The cache sits next to the CSV it was built from
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+
+
+def _meta_path(path):
+    return os.path.join(cache_dir(path), os.path.basename(path) + ".meta.json")
+
+
+def previous_version(path=CSV_PATH):
+    # Content hash recorded the last time the CSV was seen, without checking
+    # whether the file changed since (None if it was never seen)
+    meta_path = _meta_path(path)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as f:
+        return json.load(f)["sha1"]
+
+
+def data_version(path=CSV_PATH):
+    # Content hash of the CSV. The hash is only recomputed when size or mtime
+    # changed since the last time we saw the file.
+    stat = os.stat(path)
+    meta_path = _meta_path(path)
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["size"] == stat.st_size and meta["mtime_ns"] == stat.st_mtime_ns:
+            return meta["sha1"]
+
+    sha1 = _hash_file(path)
+    os.makedirs(cache_dir(path), exist_ok=True)
+    with open(meta_path, "w") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1}, f)
+    return sha1
+
+
+def cache_path(path=CSV_PATH, name="stations", ext=".feather", version=None):
+    # Every cached artifact derived from a CSV lives next to the others and
+    # carries the CSV version in its name, so stale files are never read.
+    # version picks the artifact of an earlier version of the same CSV.
+    stem = os.path.splitext(os.path.basename(path))[0]
+    version = data_version(path) if version is None else version
+    return os.path.join(cache_dir(path), f"{stem}.{name}.v{CACHE_FORMAT}.{version[:16]}{ext}")
+
+
+def prune_cache(path, name, keep):
+    # Drop older versions of one cached artifact
+    stem = os.path.splitext(os.path.basename(path))[0]
+    prefix = f"{stem}.{name}."
+    for entry in os.listdir(cache_dir(path)):
+        full = os.path.join(cache_dir(path), entry)
+        if entry.startswith(prefix) and full != keep:
+            os.remove(full)
+
+
+# Station Table Schema
+# Low-cardinality text is stored as categoricals so value_counts/groupby run on
+# integer codes, EVSE counts as nullable narrow ints and coordinates as float32
+# (about 1 m of precision, plenty for mapping). Free text stays as strings,
+# Arrow-backed when pyarrow is available. ZIP is read as text and normalized
+# to an integer ZIP5, so leading zeros, ".0" suffixes and ZIP+4 all match.
+
+TEXT = "string[pyarrow]" if feather is not None else "string"
+
+STATION_SCHEMA = {
+    "Fuel Type Code": "category",
+    "Station Name": TEXT,
+    "Street Address": TEXT,
+    "City": "category",
+    "State": "category",
+    "ZIP": "Int32",
+    "Status Code": "category",
+    "Groups With Access Code": "category",
+    "EV Level1 EVSE Num": "Int16",
+    "EV Level2 EVSE Num": "Int16",
+    "EV DC Fast Count": "Int16",
+    "EV Network": "category",
+    "Latitude": "float32",
+    "Longitude": "float32",
+    "ID": "Int32",
+    "Owner Type Code": "category",
+    "Facility Type": "category",
+    "Country": "category",
+}
+
+NUMERIC_DTYPES = ("Int16", "Int32", "float32")
+
+
+def normalize_zip(values):
+    # "02134", "2134", "02134-1234" and 2134.0 all become 2134
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype("string").str.extract(r"^\s*(\d{1,5})", expand=False)
+    values = pd.to_numeric(values, errors="coerce")
+    return values.where((values >= 0) & (values < 100000))
+
+
+def apply_schema(df, schema=STATION_SCHEMA):
+    for column, dtype in schema.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if column == "ZIP":
+            df[column] = normalize_zip(df[column]).round().astype(dtype)
+        elif dtype in NUMERIC_DTYPES:
+            # Longitude comes in with mixed types, bad values become NaN
+            values = pd.to_numeric(df[column], errors="coerce")
+            if dtype != "float32":
+                values = values.round()
+            df[column] = values.astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# CSV Parsing
+
+def _text_dtypes(schema=STATION_SCHEMA):
+    # Text columns can be typed by the CSV reader directly, numeric ones are
+    # coerced afterwards since the export has junk in some of them
+    return {column: dtype for column, dtype in schema.items() if dtype not in NUMERIC_DTYPES}
+
+
+def _csv_dtypes(path):
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {column: dtype for column, dtype in _text_dtypes().items() if column in header}
+    if "ZIP" in header:
+        dtypes["ZIP"] = "string"
+    if "Open Date" in header:
+        dtypes["Open Date"] = TEXT
+    return dtypes
+
+
+@traced()
+def read_stations_csv(path=CSV_PATH, nrows=None):
+    return apply_schema(pd.read_csv(path, dtype=_csv_dtypes(path), nrows=nrows, low_memory=False))
+
+
+def iter_station_chunks(path=CSV_PATH, chunksize=100_000):
+    # Typed chunks with derived columns, for files that do not fit in memory.
+    # Categories differ from chunk to chunk, so consumers must merge by label.
+    # chunksize can also be a function returning the rows of the next chunk,
+    # e.g. to shrink chunks while the consumer's aggregates grow.
+    next_rows = chunksize if callable(chunksize) else lambda: chunksize
+    with pd.read_csv(path, dtype=_csv_dtypes(path), iterator=True) as reader:
+        while True:
+            try:
+                chunk = reader.get_chunk(next_rows())
+            except StopIteration:
+                return
+            chunk = add_county_column(add_derived_columns(apply_schema(chunk)), path, use_cache=False)
+            yield chunk
+            del chunk  # Not held while the next one is parsed
+            if feather is not None:
+                # Arrow's pool keeps the freed string buffers; hand them back
+                # so they do not add up across chunks
+                import pyarrow as pa
+                pa.default_memory_pool().release_unused()
+
+
+def chunk_row_bytes(path=CSV_PATH, sample_rows=2000):
+    # Peak bytes per row of one chunk in flight. The peak is the parse: the
+    # parser's copy of the text and an 8-byte offset per field, the untyped
+    # frame it builds, and the Python str (about 57 bytes plus the text) each
+    # string value passes through on its way to Arrow. The typed copies made
+    # afterwards are smaller.
+    with open(path, "rb") as f:
+        text_bytes = sum(len(line) for line in itertools.islice(f, 1, sample_rows + 1))
+    sample = pd.read_csv(path, dtype=_csv_dtypes(path), nrows=sample_rows)
+    rows = max(len(sample), 1)
+    strings = [sample[column] for column, dtype in sample.dtypes.items() if isinstance(dtype, pd.StringDtype)]
+    string_bytes = sum(57 * values.count() + values.str.len().sum() for values in strings)
+    frame_bytes = sample.memory_usage(deep=True).sum()
+    return (text_bytes + frame_bytes + string_bytes) / rows + 8 * (len(sample.columns) + 2)
+
+
+def chunksize_for_budget(path=CSV_PATH, memory_mb=256, sample_rows=2000):
+    # Rows per chunk that keep one chunk in flight within budget
+    return max(1000, int(memory_mb * 2**20 / chunk_row_bytes(path, sample_rows)))
+
+
+# Derived Columns
+
+CHARGER_TYPES = ["Level 1", "Level 2", "DC Fast"]
+ACCESS_TYPES = ["Public", "Private"]
+
+OPEN_DATE_FORMAT = "%Y-%m-%d"  # e.g. 2021-03-15
+NO_DAY = np.iinfo(np.int32).min  # Open Day of a station without an Open Date
+
+# County boundary GeoJSON per state, regions named by the "name" property.
+# Relative paths are resolved next to this module (see boundary_path): the
+# files ship with the code, not with each export.
+COUNTY_BOUNDARIES = {"CA": "california-counties.geojson"}
+
+# National ZIP3 -> county reference table (zip3,state,county,lat,lon) shipped
+# with the code: the county of each prefix's sectional center city, as named
+# in Basemap's UScounties.shp, and a point inside it. Used for every state
+# without a boundary file and for stations outside the polygons.
+ZIP3_COUNTIES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "zip3_counties.csv")
+
+
+def boundary_path(boundary):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), boundary)
+
+
+def county_version(boundaries=COUNTY_BOUNDARIES):
+    # Combined content version of the files the County column comes from
+    sources = [boundary_path(boundary) for boundary in boundaries.values()] + [ZIP3_COUNTIES]
+    parts = [data_version(source) for source in sources if os.path.exists(source)]
+    return hashlib.sha1(":".join(parts).encode()).hexdigest()[:16]
+
+
+def _counts(df, column):
+    return df[column].to_numpy(dtype="int32", na_value=0)
+
+
+def charger_type_codes(df):
+    # Highest level wins: DC Fast > Level 2 > Level 1, -1 when there is none
+    conditions = [
+        _counts(df, "EV DC Fast Count") > 0,
+        _counts(df, "EV Level2 EVSE Num") > 0,
+        _counts(df, "EV Level1 EVSE Num") > 0,
+    ]
+    return np.select(conditions, [2, 1, 0], default=-1).astype(np.int8)
+
+
+def access_type_codes(df):
+    # Only "Public" exactly counts as public. The test runs once per category
+    # and is then broadcast through the category codes (-1 hits the False pad).
+    access = df["Groups With Access Code"].astype("category")
+    is_public = np.append(access.cat.categories == "Public", False)[access.cat.codes.to_numpy()]
+    return np.where(is_public, 0, 1).astype(np.int8)
+
+
+def county_label(state, county):
+    # County labels carry the state ("Orange, CA"): the same name recurs
+    # across states
+    return f"{county}, {state}"
+
+
+def county_name(label):
+    # County name of a county_label
+    return label.rsplit(", ", 1)[0]
+
+
+def state_county_counts(df, state):
+    # Stations per county name in one state, sorted descending; stations
+    # placed in another state's county by their ZIP are left out
+    in_state = (df["State"] == state).to_numpy(dtype=bool, na_value=False)
+    counts = df.loc[in_state, "County"].value_counts()
+    counts = counts[counts.index.astype(str).str.endswith(f", {state}")]
+    return pd.Series(counts.to_numpy(), index=pd.Index(counts.index.map(county_name).astype(str), name="County"))
+
+
+def zip5_values(df):
+    return normalize_zip(df["ZIP"]).to_numpy(dtype="float64", na_value=np.nan)
+
+
+@functools.lru_cache(maxsize=None)
+def load_zip3_lookup(path=ZIP3_COUNTIES):
+    # (lookup, counties): lookup[zip3] is a county code or -1, and slot 1000
+    # catches missing ZIPs
+    table = pd.read_csv(path, dtype={"zip3": "int64", "state": "string", "county": "string"})
+    labels = [county_label(state, county) for state, county in zip(table["state"], table["county"])]
+    counties = sorted(set(labels))
+    lookup = np.full(1001, -1, dtype=np.int16)
+    lookup[table["zip3"].to_numpy()] = pd.Categorical(labels, categories=counties).codes
+    return lookup, counties
+
+
+def county_codes(df, lookup_path=ZIP3_COUNTIES):
+    # County by ZIP prefix: one fancy-index over the integer ZIPs
+    lookup, counties = load_zip3_lookup(lookup_path)
+    zips = zip5_values(df)
+    zip3 = np.where(np.isnan(zips), 1000, zips // 100).astype(np.int64)
+    return lookup[zip3], counties
+
+
+def recode(codes, labels, new_labels):
+    # Category codes over labels -> codes over new_labels, -1 stays -1
+    table = np.array([new_labels.index(label) for label in labels] + [-1], dtype=np.int16)
+    return table[codes]
+
+
+@traced()
+def add_county_column(df, path=CSV_PATH, use_cache=True, boundaries=COUNTY_BOUNDARIES):
+    # County by ZIP prefix everywhere, replaced by the point-in-polygon join
+    # for the states that have a boundary file wherever the join finds one
+    # (stations without coordinates keep their ZIP county)
+    codes, counties = county_codes(df)
+    found = {}
+    for state, boundary in boundaries.items():
+        if os.path.exists(boundary_path(boundary)):
+            found[state] = boundary_path(boundary)
+        else:
+            warnings.warn(f"county boundary file for {state} not found: {boundary_path(boundary)}; "
+                          f"using ZIP3 counties instead")
+    boundaries = found
+    try:
+        from ev_regions import region_codes
+    except ImportError:  # No shapely: ZIP prefixes only
+        boundaries = {}
+
+    if boundaries:
+        joined, joined_counties = region_codes(df, boundaries, path, use_cache)
+        names = sorted(set(counties) | set(joined_counties))
+        in_joined = df["State"].isin(list(boundaries)).to_numpy(dtype=bool) & (joined >= 0)
+        codes = np.where(in_joined, recode(joined, joined_counties, names), recode(codes, counties, names))
+        counties = names
+    df["County"] = pd.Categorical.from_codes(codes, counties)
+    return df
+
+
+def parse_open_days(values):
+    # Open Date to days since 1970-01-01 as int32, NO_DAY when missing. One
+    # pass with the export's fixed format (Arrow's strptime when available);
+    # values in any other format go through pandas' inference.
+    if pd.api.types.is_datetime64_any_dtype(values):
+        dates = values.to_numpy(dtype="datetime64[D]")
+        return np.where(np.isnat(dates), NO_DAY, dates.astype(np.int64)).astype(np.int32)
+
+    if feather is not None:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        parsed = pc.strptime(pa.array(values, type=pa.string(), from_pandas=True), format=OPEN_DATE_FORMAT,
+                             unit="s", error_is_null=True)
+        days = np.array(pc.fill_null(parsed.cast(pa.date32()).cast(pa.int32()), NO_DAY))
+    else:
+        dates = pd.to_datetime(values, format=OPEN_DATE_FORMAT, errors="coerce").to_numpy(dtype="datetime64[D]")
+        days = np.where(np.isnat(dates), NO_DAY, dates.astype(np.int64)).astype(np.int32)
+
+    retry = (days == NO_DAY) & values.notna().to_numpy()
+    if retry.any():
+        dates = pd.to_datetime(values[retry], errors="coerce", format="mixed").to_numpy(dtype="datetime64[D]")
+        days[retry] = np.where(np.isnat(dates), NO_DAY, dates.astype(np.int64))
+    return days
+
+
+def open_days(df):
+    # Open Day as int64 day numbers, NO_DAY when missing
+    return df["Open Day"].to_numpy(dtype="int64", na_value=NO_DAY)
+
+
+@traced()
+def add_derived_columns(df):
+    df["Charger Type"] = pd.Categorical.from_codes(charger_type_codes(df), CHARGER_TYPES)
+    df["Access Type"] = pd.Categorical.from_codes(access_type_codes(df), ACCESS_TYPES)
+
+    days = parse_open_days(df["Open Date"])
+    missing = days == NO_DAY
+    dates = np.where(missing, np.datetime64("NaT"), days.astype("datetime64[D]"))
+    df["Open Day"] = pd.arrays.IntegerArray(np.where(missing, 0, days).astype(np.int32), missing)
+    df["Open Date"] = pd.to_datetime(dates)
+    df["Open Year"] = pd.arrays.IntegerArray(
+        np.where(missing, 0, dates.astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int16), missing)
+    return df
+
+
+# Station Keys
+# Station ID plus a hash of the typed source row (before derived columns),
+# saved with every cached table so the next export can be diffed against it
+# (see ev_refresh.py).
+
+def row_keys(df):
+    ids = df["ID"].to_numpy(dtype="int64", na_value=-1)
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return ids, hashes
+
+
+def write_keys(ids, hashes, path):
+    target = cache_path(path, "keys", ".npz")
+    np.savez(target + ".tmp.npz", ids=ids, hashes=hashes)
+    os.replace(target + ".tmp.npz", target)
+    prune_cache(path, "keys", keep=target)
+
+
+def read_keys(path, version=None):
+    target = cache_path(path, "keys", ".npz", version)
+    if not os.path.exists(target):
+        return None
+    with np.load(target) as keys:
+        return keys["ids"], keys["hashes"]
+
+
+# Cached Loading
+
+@traced()
+def write_frame_cache(df, path, name):
+    target = cache_path(path, name)
+    tmp = target + ".tmp"
+    feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+    os.replace(tmp, target)
+    prune_cache(path, name, keep=target)
+    return target
+
+
+@traced()
+def read_frame_cache(path, name, version=None):
+    target = cache_path(path, name, version=version)
+    if not os.path.exists(target):
+        return None
+    # Uncompressed Feather can be mapped straight from the page cache
+    return feather.read_table(target, memory_map=True).to_pandas()
+
+
+@traced()
+def load_stations(path=CSV_PATH, use_cache=True):
+    if not use_cache or feather is None:
+        return add_county_column(add_derived_columns(read_stations_csv(path)), path, use_cache=False)
+
+    df = read_frame_cache(path, "stations")
+    if df is None:
+        df = read_stations_csv(path)
+        write_keys(*row_keys(df), path)
+        df = add_derived_columns(df)
+        write_frame_cache(df, path, "stations")
+    return add_county_column(df, path)
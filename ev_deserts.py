@@ -0,0 +1,365 @@
+'''
+Charging deserts: how far every place is from a public charger.
+
+Each map extent (contiguous US, Alaska, Hawaii) is covered by a grid of
+roughly square cells, 1 km by default, laid out in the extent's cached
+Mercator projection so the rasters line up with the map backgrounds. Every
+cell centre inside a US county gets the great-circle distance to the nearest
+public DC fast and the nearest public level 2 station, from one KD-tree per
+kind over the station unit vectors (as in ev_search), queried a chunk of
+cells at a time on all cores.
+
+Cells are given a state and county by the county polygons that ship with
+Basemap (UScounties.shp). Blocks of cells that lie entirely inside one
+county take its code with a single polygon test, blocks on a county line or
+the coast are split into smaller blocks (BLOCKS), and only the smallest of
+those go through the per-cell join. Cells outside every
+county (ocean, Canada, Mexico) stay out of the rasters and the statistics,
+as does land outside the three extents (the western Aleutians, Puerto Rico).
+
+The grid and its county codes depend only on the extent and the cell size
+and are kept in .ev_cache/deserts/. The distance rasters are float32 .npy
+files (NaN outside the US) cached per dataset version and memory-mapped on
+load.
+
+    deserts = load_deserts()
+    deserts.summary("State")     # area, mean / median / p90 / max km, desert share
+    deserts.summary("County")
+    deserts.draw(ax, "conus", "dc")
+
+Statistics are weighted by cell area. A cell counts as a desert for a kind
+when its nearest station is farther than DESERT_KM[kind].
+
+Usage: python ev_deserts.py [path] [--km 1] [--by State|County] [--out deserts.csv] [--map deserts.png]
+'''
+
+import argparse
+import functools
+import os
+
+import numpy as np
+import pandas as pd
+
+from ev_basemaps import EXTENTS, get_basemap
+from ev_data import CSV_PATH, cache_dir, cache_path, load_stations, prune_cache
+from ev_trace import traced
+
+DESERT_EXTENTS = ["conus", "alaska", "hawaii"]
+KINDS = {"dc": "EV DC Fast Count", "l2": "EV Level2 EVSE Num"}
+DESERT_KM = {"dc": 50, "l2": 15}
+
+BLOCKS = (64, 16, 4)  # Block sides, in cells, for the county assignment
+CHUNK_CELLS = 1 << 20  # Cells per nearest-station query or polygon join
+
+
+# Grid
+
+class DesertGrid:
+    def __init__(self, extent, km, bounds, lon, lat, codes, states, counties):
+        # lon: (cols,) and lat: (rows,) cell-centre coordinates, row 0 at the
+        # top; codes: (rows, cols) int16 county per cell, -1 outside the US;
+        # states, counties: state and county name per county code
+        self.extent = extent
+        self.km = km
+        self.bounds = bounds
+        self.lon = lon
+        self.lat = lat
+        self.codes = codes
+        self.states = states
+        self.counties = counties
+
+    @property
+    def shape(self):
+        return self.codes.shape
+
+    @property
+    def row_area(self):
+        # km2 per cell, by row: the cells are km wide at the middle latitude
+        # of the extent and shrink with cos(lat) away from it
+        return (self.km * np.cos(np.radians(self.lat)) / np.cos(np.radians(_mid_lat(self.extent)))) ** 2
+
+    @classmethod
+    @traced()
+    def build(cls, extent, km=1):
+        from ev_regions import RegionIndex
+
+        m = get_basemap(extent)
+        x0, x1, y0, y1 = m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry
+        cell = km * 1000 / np.cos(np.radians(_mid_lat(extent)))
+        cols, rows = int(np.ceil((x1 - x0) / cell)), int(np.ceil((y1 - y0) / cell))
+        x_edges = x0 + np.arange(cols + 1) * cell
+        y_edges = y1 - np.arange(rows + 1) * cell
+        lon_edges = m(x_edges, np.full(cols + 1, y1), inverse=True)[0]
+        lat_edges = m(np.full(rows + 1, x0), y_edges, inverse=True)[1]
+        lon = m(x_edges[:-1] + cell / 2, np.full(cols, y1), inverse=True)[0]
+        lat = m(np.full(rows, x0), y_edges[:-1] - cell / 2, inverse=True)[1]
+
+        states, counties, polygon_codes, geometries = _county_polygons()
+        index = RegionIndex(polygon_codes, geometries)
+        codes = _cell_codes(index, lon, lat, lon_edges, lat_edges)
+        codes = np.where(codes >= 0, np.asarray(polygon_codes, dtype=np.int16)[codes], -1).astype(np.int16)
+        bounds = (x0, x0 + cols * cell, y1 - rows * cell, y1)
+        return cls(extent, km, bounds, lon, lat, codes, states, counties)
+
+    # Persistence
+
+    def save(self, target):
+        np.savez(target + ".tmp.npz", bounds=np.array(self.bounds), lon=self.lon, lat=self.lat, codes=self.codes,
+                 states=np.array(self.states, dtype=str), counties=np.array(self.counties, dtype=str))
+        os.replace(target + ".tmp.npz", target)
+
+    @classmethod
+    def load(cls, target, extent, km):
+        with np.load(target) as data:
+            return cls(extent, km, tuple(data["bounds"]), data["lon"], data["lat"], data["codes"],
+                       [str(state) for state in data["states"]], [str(county) for county in data["counties"]])
+
+
+def _mid_lat(extent):
+    return (EXTENTS[extent][0] + EXTENTS[extent][1]) / 2
+
+
+def _county_polygons():
+    # (state per county, name per county, county code per polygon, polygons)
+    # from Basemap's county shapefile; a county may have several polygons
+    import geopandas as gpd
+    from mpl_toolkits.basemap import basemap_datadir
+
+    shapes = gpd.read_file(os.path.join(basemap_datadir, "UScounties.shp"))
+    keys = pd.MultiIndex.from_arrays([shapes["STATE"], shapes["NAME"]])
+    codes, unique = pd.factorize(keys, sort=True)
+    return ([state for state, _ in unique], [name for _, name in unique], codes.tolist(),
+            shapes.geometry.to_numpy())
+
+
+def _cell_codes(index, lon, lat, lon_edges, lat_edges, blocks=BLOCKS):
+    # Region index per cell centre, -1 outside every region. Blocks of cells
+    # inside a single polygon are filled whole, blocks outside all polygons
+    # are dropped, and blocks crossing a polygon edge are split into the next
+    # block size, down to a per-cell join in the smallest crossing blocks.
+    import shapely
+
+    rows, cols = len(lat), len(lon)
+    codes = np.full((rows, cols), -1, dtype=np.int64)
+    first_row, first_col = (corner.ravel() for corner in np.meshgrid(
+        np.arange(0, rows, blocks[0]), np.arange(0, cols, blocks[0]), indexing="ij"))
+    for level, size in enumerate(blocks):
+        last_row, last_col = np.minimum(first_row + size, rows), np.minimum(first_col + size, cols)
+        boxes = shapely.box(lon_edges[first_col], lat_edges[last_row], lon_edges[last_col], lat_edges[first_row])
+        inside, regions = index.tree.query(boxes, predicate="within")
+        # Highest region first, so where polygons overlap the first one wins
+        for block, region in sorted(zip(inside, regions), key=lambda pair: -pair[1]):
+            codes[first_row[block]:last_row[block], first_col[block]:last_col[block]] = region
+        crossing = np.zeros(len(boxes), dtype=bool)
+        crossing[index.tree.query(boxes, predicate="intersects")[0]] = True
+        crossing[inside] = False
+        first_row, first_col = first_row[crossing], first_col[crossing]
+
+        step = blocks[level + 1] if level + 1 < len(blocks) else 1
+        offsets = np.arange(0, size, step)
+        first_row = (first_row[:, None, None] + offsets[None, :, None]).repeat(len(offsets), axis=2).ravel()
+        first_col = (first_col[:, None, None] + offsets[None, None, :]).repeat(len(offsets), axis=1).ravel()
+        valid = (first_row < rows) & (first_col < cols)
+        first_row, first_col = first_row[valid], first_col[valid]
+
+    # first_row, first_col are now the single cells left over
+    cells = first_row * cols + first_col
+    for start in range(0, len(cells), CHUNK_CELLS):
+        chunk = cells[start:start + CHUNK_CELLS]
+        row, col = np.divmod(chunk, cols)
+        codes.flat[chunk] = index.assign(lon[col], lat[row])
+    return codes
+
+
+def _grid_target(extent, km):
+    from mpl_toolkits.basemap import __version__
+
+    directory = os.path.join(cache_dir(), "deserts")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"{extent}.{km:g}km.{__version__}.npz")
+
+
+@functools.lru_cache(maxsize=None)
+def load_grid(extent, km=1):
+    target = _grid_target(extent, km)
+    if not os.path.exists(target):
+        DesertGrid.build(extent, km).save(target)
+    return DesertGrid.load(target, extent, km)
+
+
+# Distances
+
+def station_trees(df, coords):
+    # {kind: KD-tree over the unit vectors of the public stations of that kind}
+    from scipy.spatial import cKDTree
+
+    from ev_search import unit_vectors
+
+    public = np.asarray(coords.access) == 0
+    rows = np.asarray(coords.rows)
+    trees = {}
+    for kind, column in KINDS.items():
+        has = public & (df[column].to_numpy(dtype="int32", na_value=0)[rows] > 0)
+        trees[kind] = cKDTree(unit_vectors(coords.lat[has], coords.lon[has]))
+    return trees
+
+
+@traced()
+def nearest_distances(grid, trees):
+    # (kinds, rows, cols) float32 km to the nearest station of each kind,
+    # NaN outside the US and inf when there is no station of that kind
+    from ev_search import chord_to_distance, unit_vectors
+
+    distances = np.full((len(trees),) + grid.shape, np.nan, dtype=np.float32)
+    cells = np.flatnonzero(grid.codes >= 0)
+    for start in range(0, len(cells), CHUNK_CELLS):
+        chunk = cells[start:start + CHUNK_CELLS]
+        row, col = np.divmod(chunk, grid.shape[1])
+        points = unit_vectors(grid.lat[row], grid.lon[col])
+        for i, tree in enumerate(trees.values()):
+            if tree.n == 0:
+                distances[i].flat[chunk] = np.inf
+                continue
+            chords, _ = tree.query(points, workers=-1)
+            distances[i].flat[chunk] = chord_to_distance(chords, "km")
+    return distances
+
+
+# Statistics
+
+def weighted_quantiles(values, weights, groups, n_groups, quantiles):
+    # {q: per-group weighted quantile, NaN for empty groups}: sort by (group,
+    # value), then find where the running weight crosses q of each group's
+    # total; q = 1 is the group's maximum. Sorting the values, then stably by
+    # the narrow group codes (a radix sort), is several times faster than
+    # np.lexsort; ties between equal values do not matter.
+    order = np.argsort(values)
+    order = order[np.argsort(groups[order], kind="stable")]
+    running = np.cumsum(weights[order])
+    totals = np.bincount(groups, weights, n_groups)
+    before = np.cumsum(totals) - totals
+    last = np.cumsum(np.bincount(groups, minlength=n_groups)) - 1
+    sorted_values = np.append(values[order], np.nan)  # Pad for the positions of empty groups
+    result = {}
+    for q in quantiles:
+        positions = last if q >= 1 else np.minimum(np.searchsorted(running, before + q * totals), last)
+        result[q] = np.where(totals > 0, sorted_values[positions], np.nan)
+    return result
+
+
+class DesertMap:
+    def __init__(self, grids, distances):
+        # grids: {extent: DesertGrid}; distances: {extent: (kinds, rows, cols)}
+        self.grids = grids
+        self.distances = distances
+        self._cells = None
+
+    def cells(self):
+        # (county codes, km2, {kind: km}) of every US cell over all extents,
+        # gathered once
+        if self._cells is None:
+            codes, weights, values = [], [], {kind: [] for kind in KINDS}
+            for extent, grid in self.grids.items():
+                inside = grid.codes >= 0
+                codes.append(grid.codes[inside])
+                weights.append(np.repeat(grid.row_area, inside.sum(axis=1)))
+                for i, kind in enumerate(KINDS):
+                    values[kind].append(self.distances[extent][i][inside])
+            self._cells = (np.concatenate(codes), np.concatenate(weights),
+                           {kind: np.concatenate(parts) for kind, parts in values.items()})
+        return self._cells
+
+    @traced()
+    def summary(self, by="State"):
+        # Area and area-weighted distance statistics per state or county
+        grid = next(iter(self.grids.values()))
+        states, counties = grid.states, grid.counties
+        codes, weights, values = self.cells()
+
+        if by == "State":
+            labels = sorted(set(states))
+            groups = np.searchsorted(labels, np.array(states)).astype(np.int16)[codes]
+            index = pd.Index(labels, name="State")
+        elif by == "County":
+            labels = list(range(len(counties)))
+            groups = codes
+            index = pd.MultiIndex.from_arrays([states, counties], names=["State", "County"])
+        else:
+            raise ValueError(f"by must be 'State' or 'County', not {by!r}")
+
+        n_groups = len(labels)
+        area = np.bincount(groups, weights, n_groups)
+        table = {"area_km2": area}
+        for kind in KINDS:
+            kind_values = values[kind]
+            quantiles = weighted_quantiles(kind_values, weights, groups, n_groups, (0.5, 0.9, 1))
+            desert = np.bincount(groups, weights * (kind_values > DESERT_KM[kind]), n_groups)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                table[f"{kind}_mean_km"] = np.bincount(groups, weights * kind_values, n_groups) / area
+                table[f"{kind}_median_km"] = quantiles[0.5]
+                table[f"{kind}_p90_km"] = quantiles[0.9]
+                table[f"{kind}_max_km"] = quantiles[1]
+                table[f"{kind}_desert_share"] = desert / area
+        frame = pd.DataFrame(table, index=index)
+        return frame[frame["area_km2"] > 0]
+
+    def draw(self, ax, extent="conus", kind="dc", max_km=None, cmap="magma_r"):
+        # Distance raster of one kind over the extent, for a map drawn with
+        # ev_basemaps.draw_background; returns the image for a colorbar
+        grid = self.grids[extent]
+        image = np.ma.masked_invalid(self.distances[extent][list(KINDS).index(kind)])
+        artist = ax.imshow(image, extent=grid.bounds, origin="upper", interpolation="nearest", cmap=cmap,
+                           vmin=0, vmax=max_km or 2 * DESERT_KM[kind], zorder=1)
+        ax.set_xlim(grid.bounds[0], grid.bounds[1])
+        ax.set_ylim(grid.bounds[2], grid.bounds[3])
+        return artist
+
+
+@traced()
+def load_deserts(path=CSV_PATH, df=None, km=1, extents=DESERT_EXTENTS):
+    from ev_coords import load_coordinates
+
+    grids = {extent: load_grid(extent, km) for extent in extents}
+    distances, trees = {}, None
+    for extent, grid in grids.items():
+        name = f"deserts_{extent}_{km:g}km"
+        target = cache_path(path, name, ".npy")
+        if not os.path.exists(target):
+            if trees is None:
+                df = load_stations(path) if df is None else df
+                trees = station_trees(df, load_coordinates(path, df))
+            np.save(target + ".tmp.npy", nearest_distances(grid, trees))
+            os.replace(target + ".tmp.npy", target)
+            prune_cache(path, name, keep=target)
+        distances[extent] = np.load(target, mmap_mode="r")
+    return DesertMap(grids, distances)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distance to the nearest public DC fast and level 2 charger")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--km", type=float, default=1, help="Cell size in km (default: 1)")
+    parser.add_argument("--by", choices=["State", "County"], default="State")
+    parser.add_argument("--out", help="Write the summary to this CSV")
+    parser.add_argument("--map", help="Draw the DC fast distances of the contiguous US to this image")
+    args = parser.parse_args()
+
+    deserts = load_deserts(args.path, km=args.km)
+    summary = deserts.summary(args.by)
+    if args.out:
+        summary.to_csv(args.out)
+    with pd.option_context("display.width", 160, "display.max_columns", None):
+        print(summary.sort_values("dc_desert_share", ascending=False).head(20).round(2))
+
+    if args.map:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        from ev_basemaps import draw_background
+
+        fig = Figure(figsize=(16, 9))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        draw_background(ax, "conus")
+        fig.colorbar(deserts.draw(ax, "conus", "dc"), ax=ax, label="km to the nearest public DC fast charger")
+        fig.savefig(args.map, dpi=100, bbox_inches="tight")
@@ -0,0 +1,708 @@
+'''
+Figure registry for the ev_stations.py charts.
+
+Every chart is a function registered with a name (its file name in
+"Output Images"), a folder and tags. Its parameters name the inputs it needs
+(df, cube, timeline, coords, stations, path). Inputs are loaded lazily, so
+rendering only cube charts never loads the station table.
+
+ev_stations.py shows the figures one by one. The command line renders any
+subset headlessly. Rendered files are cached in .ev_cache/figures/, keyed by
+the versions of the figure's inputs and by its code (the function, the
+helpers and constants it uses, and the renderer modules), so unchanged
+figures are copied instead of drawn again:
+
+    python ev_figures.py --list
+    python ev_figures.py --figures by_state by_city --format png svg
+    python ev_figures.py --tags map california --out "Output Images"
+'''
+
+import argparse
+import functools
+import hashlib
+import importlib.util
+import inspect
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from ev_data import (CACHE_FORMAT, COUNTY_BOUNDARIES, CSV_PATH, boundary_path, cache_dir, county_version,
+                     data_version, state_county_counts)
+from ev_trace import TRACER, stage
+
+OUTPUT_DIR = "Output Images"
+
+# Modules whose code shapes the figures beyond the figure functions: the
+# inputs (table, cube, coordinates, timeline) and the drawing helpers
+RENDER_MODULES = ["ev_data", "ev_cube", "ev_coords", "ev_timeline", "ev_maps", "ev_raster", "ev_basemaps"]
+
+FIGURES = {}
+
+
+class FigureSpec:
+    def __init__(self, name, func, folder, tags):
+        self.name = name
+        self.func = func
+        self.folder = folder
+        self.tags = set(tags)
+        self.inputs = list(inspect.signature(func).parameters)
+
+    def draw(self, inputs):
+        # Draw with pyplot and return the Figure. Inputs load outside the
+        # figure's stage, so it only times the drawing.
+        kwargs = {name: getattr(inputs, name) for name in self.inputs}
+        with stage(f"draw {self.name}"):
+            return self.func(**kwargs)
+
+    @functools.cached_property
+    def code_version(self):
+        # The function plus the module-level helpers and constants it uses
+        digest = hashlib.sha1(_render_modules_version().encode())
+        seen, pending = set(), [self.func]
+        while pending:
+            value = pending.pop(0)
+            if not inspect.isfunction(value):
+                digest.update(repr(value).encode())
+                continue
+            digest.update(inspect.getsource(value).encode())
+            for name in _global_names(value.__code__):
+                used = value.__globals__.get(name)
+                if name not in seen and (isinstance(used, (dict, list, str))
+                                         or inspect.isfunction(used) and used.__module__ == value.__module__):
+                    seen.add(name)
+                    pending.append(used)
+        return digest.hexdigest()
+
+    def key(self, inputs):
+        parts = [self.name, self.code_version] + [f"{name}={inputs.version(name)}" for name in self.inputs]
+        return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def _global_names(code):
+    # Global names used by a code object and the lambdas and comprehensions
+    # nested in it
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names += _global_names(const)
+    return names
+
+
+@functools.lru_cache(maxsize=None)
+def _render_modules_version():
+    import matplotlib
+
+    digest = hashlib.sha1(matplotlib.__version__.encode())
+    for module in RENDER_MODULES:
+        with open(importlib.util.find_spec(module).origin, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def register(name, folder, tags=()):
+    def wrap(func):
+        FIGURES[name] = FigureSpec(name, func, folder, tags)
+        return func
+    return wrap
+
+
+def select(names=None, tags=None):
+    # Figures matching any of the names or any of the tags, in registry order.
+    # Nothing given selects everything.
+    unknown = set(names or ()) - set(FIGURES)
+    if unknown:
+        raise KeyError(f"Unknown figures: {', '.join(sorted(unknown))}")
+    if not names and not tags:
+        return list(FIGURES.values())
+    return [spec for spec in FIGURES.values()
+            if spec.name in (names or ()) or spec.tags & set(tags or ())]
+
+
+class FigureInputs:
+    # Data the figures take, each loaded on first use
+    def __init__(self, path=CSV_PATH):
+        self.path = path
+
+    def version(self, name):
+        # Version of one input without loading it: the CSV version, plus the
+        # county sources for inputs that carry the County column
+        parts = [data_version(self.path), str(CACHE_FORMAT)]
+        if name in ("df", "path", "timeline"):
+            parts.append(county_version())
+        return hashlib.sha1(":".join(parts).encode()).hexdigest()[:16]
+
+    @functools.cached_property
+    def df(self):
+        from ev_data import load_stations
+        return load_stations(self.path)
+
+    @functools.cached_property
+    def cube(self):
+        from ev_cube import load_cube
+        return load_cube(self.path, self.__dict__.get("df"))
+
+    @functools.cached_property
+    def coords(self):
+        from ev_coords import load_coordinates
+        return load_coordinates(self.path, self.__dict__.get("df"))
+
+    @functools.cached_property
+    def timeline(self):
+        from ev_timeline import load_timeline
+        return load_timeline(self.path, self.__dict__.get("df"))
+
+    @functools.cached_property
+    def stations(self):
+        from ev_maps import StationMap
+        return StationMap(self.coords)
+
+
+class RenderReport:
+    def __init__(self):
+        self.written = []
+        self.cached = []
+        self.rendered = []
+        self.saved = 0.0
+        self.elapsed = 0.0
+
+    def summary(self):
+        return (f"{len(self.cached)} cached, {len(self.rendered)} rendered, "
+                f"{self.saved:.1f} s saved, {self.elapsed:.1f} s total")
+
+
+def _figure_cache(inputs, spec, key):
+    # Cached files of one figure version: <name>.<key>.<format> plus
+    # <name>.<key>.json with the time it took to render
+    figure_dir = os.path.join(cache_dir(inputs.path), "figures")
+    os.makedirs(figure_dir, exist_ok=True)
+    return os.path.join(figure_dir, f"{spec.name}.{key}")
+
+
+def _prune_figure_cache(stem):
+    # Older versions of the same figure
+    figure_dir, current = os.path.split(stem)
+    name = current.rsplit(".", 1)[0]
+    for entry in os.listdir(figure_dir):
+        if entry.startswith(name + ".") and not entry.startswith(current + "."):
+            os.remove(os.path.join(figure_dir, entry))
+
+
+def render(specs, inputs, out_dir=OUTPUT_DIR, formats=("png",), use_cache=True):
+    # Save each figure to out_dir/<folder>/<name>.<format>, copying it from
+    # the figure cache when nothing it depends on changed
+    import matplotlib.pyplot as plt
+
+    report = RenderReport()
+    start = time.perf_counter()
+    for spec in specs:
+        os.makedirs(os.path.join(out_dir, spec.folder), exist_ok=True)
+        targets = {fmt: os.path.join(out_dir, spec.folder, f"{spec.name}.{fmt}") for fmt in formats}
+        stem = _figure_cache(inputs, spec, spec.key(inputs)) if use_cache else None
+
+        if stem is not None and all(os.path.exists(f"{stem}.{ext}") for ext in list(formats) + ["json"]):
+            for fmt, target in targets.items():
+                shutil.copyfile(f"{stem}.{fmt}", target)
+            with open(f"{stem}.json") as f:
+                report.saved += json.load(f)["seconds"]
+            report.cached.append(spec.name)
+        else:
+            began = time.perf_counter()
+            fig = spec.draw(inputs)
+            for fmt, target in targets.items():
+                with stage(f"save {spec.name}", format=fmt):
+                    fig.savefig(target, format=fmt, bbox_inches="tight")
+            plt.close(fig)
+            seconds = time.perf_counter() - began
+            if stem is not None:
+                for fmt, target in targets.items():
+                    shutil.copyfile(target, f"{stem}.{fmt}")
+                with open(f"{stem}.json", "w") as f:
+                    json.dump({"seconds": seconds}, f)
+                _prune_figure_cache(stem)
+            report.rendered.append(spec.name)
+        report.written.extend(targets.values())
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+# Basic Distribution
+
+@register("by_state", "Basic Distribution", tags=["basic", "state"])
+def stations_by_state(cube):
+    import matplotlib.pyplot as plt
+
+    state = cube.counts('State')
+    fig = plt.figure(figsize=(12, 6))
+    plt.bar(state.index, state.values)
+    plt.xlabel("State")
+    plt.ylabel("Number of Stations")
+    plt.title("Number of Stations by State")
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.xticks(rotation=90)
+    return fig
+
+
+@register("by_city", "Basic Distribution", tags=["basic", "city"])
+def stations_by_city(df):
+    import matplotlib.pyplot as plt
+
+    city = df['City'].value_counts() # City has too many values for the cube
+    city_filtered = city[:30]
+    fig = plt.figure(figsize=(12, 6))
+    plt.bar(city_filtered.index, city_filtered.values)
+    plt.xlabel("City")
+    plt.ylabel("Number of Stations")
+    plt.title("Number of Stations by City")
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    plt.xticks(rotation=90)
+    return fig
+
+
+@register("us_map", "Map Distribution", tags=["map"])
+def us_map(stations):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 8))
+    stations.background(plt.gca(), "conus", style="dark") # Map without Alaska and Hawaii :(
+    return fig
+
+
+# Deeper Distribution
+
+@register("facility_type_distribution", "Deeper Distribution", tags=["deeper", "facility"])
+def facility_type_distribution(df):
+    import matplotlib.pyplot as plt
+
+    facility_type = df['Facility Type'].value_counts()
+    facility_type = facility_type[facility_type > 0]
+    threshold = 0.02 * facility_type.sum()
+    # Types under 2% of all stations are pooled into "Other"
+    sizes = facility_type[facility_type >= threshold]
+    labels = sizes.index.to_list() + ["Other"]
+    sizes = sizes.values.tolist() + [facility_type[facility_type < threshold].sum()]
+    fig = plt.figure(figsize=(8, 8))
+    plt.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=140, wedgeprops={'edgecolor': 'black'})
+    plt.title("Facility Type Distribution")
+    return fig
+
+
+NETWORK_COLORS = {
+    "Tesla": "red",
+    "ChargePoint": "blue",
+    "Blink": "green",
+    "EVgo": "purple",
+    "Other": "black"
+}
+
+
+@register("ev_network_distribution_map", "Map Distribution", tags=["map", "network"])
+def ev_network_distribution_map(stations):
+    import matplotlib.pyplot as plt
+
+    fig = plt.figure(figsize=(12, 8))
+    stations.background(plt.gca(), "conus", style="dark") # Map without Alaska and Hawaii :(
+    stations.scatter(plt.gca(), "conus", ["network"],
+                     lambda network: network if network in NETWORK_COLORS or network is None else "Other",
+                     {network: dict(marker="o", color=color, alpha=0.5, s=5) for network, color in NETWORK_COLORS.items()})
+    plt.legend(handles=[plt.Line2D([0], [0], marker="o", color="w", markerfacecolor=color, markersize=4, label=name)
+                        for name, color in NETWORK_COLORS.items()], loc="lower left")
+    plt.title("EV Network Distribution Across the U.S.")
+    return fig
+
+
+def _owner_ratio_figure(state_owner_ratios):
+    import matplotlib.pyplot as plt
+
+    ax = state_owner_ratios.plot(kind='bar', stacked=True, figsize=(12, 8))
+    plt.title("Owner Type Distribution by State")
+    plt.xlabel("State")
+    plt.ylabel("Percentage")
+    plt.legend(title="Owner Type")
+    plt.xticks(rotation=45)
+    return ax.get_figure()
+
+
+def _valid_states(cube):
+    state_counts = cube.counts('State')
+    return state_counts[state_counts > 10].index
+
+
+# State vs Owner Separately
+
+@register("state_vs_owner_code", "Deeper Distribution", tags=["deeper", "owner", "state"])
+def state_vs_owner_code(cube):
+    return _owner_ratio_figure(cube.where('State', _valid_states(cube)).ratios('State', 'Owner Type Code'))
+
+
+# State vs Owner Public/Private/PPP
+# FG/SG/LG/T -> Public, P -> Private, J -> PPP
+
+@register("state_vs_owner", "Deeper Distribution", tags=["deeper", "owner", "state"])
+def state_vs_owner(cube):
+    from ev_cube import OWNER_GROUPS
+
+    owner_groups = cube.where('State', _valid_states(cube)).relabel('Owner Type Code', OWNER_GROUPS)
+    return _owner_ratio_figure(owner_groups.ratios('State', 'Owner Type Code'))
+
+
+@register("state_vs_owner_sorted", "Deeper Distribution", tags=["deeper", "owner", "state"])
+def state_vs_owner_sorted(cube):
+    from ev_cube import OWNER_GROUPS
+
+    owner_groups = cube.where('State', _valid_states(cube)).relabel('Owner Type Code', OWNER_GROUPS)
+    return _owner_ratio_figure(owner_groups.ratios('State', 'Owner Type Code', sort_by='Public'))
+
+
+# Open Data Trend
+
+@register("stations_openings_vs_year_quarter", "Deeper Distribution", tags=["deeper", "trend"])
+def stations_openings_vs_year_quarter(cube):
+    import matplotlib.pyplot as plt
+
+    quarter_counts = cube.openings(freq="Q")
+    quarter_counts = quarter_counts[quarter_counts.index.year < 2022]
+
+    fig = plt.figure(figsize=(20, 6))
+    plt.xlim(-0.5, len(quarter_counts) - 0.5)
+    plt.plot(quarter_counts.index.astype(str), quarter_counts.values, marker="", linestyle="-")
+    plt.xlabel("Year-Quarter")
+    plt.ylabel("Number of New Stations")
+    plt.title("Quarterly Trend of EV Charging Stations Openings")
+    plt.xticks(rotation=45)
+    plt.grid(True)
+    return fig
+
+
+@register("stations_openings_vs_year", "Deeper Distribution", tags=["deeper", "trend"])
+def stations_openings_vs_year(cube):
+    import matplotlib.pyplot as plt
+
+    year_counts = cube.openings(freq="Y")
+    year_counts = year_counts[year_counts.index.year < 2022]
+
+    fig = plt.figure(figsize=(20, 6))
+    plt.xlim(-0.5, len(year_counts) - 0.5)
+    plt.ylim(0, max(year_counts.values) * 1.1)
+    plt.plot(year_counts.index.astype(str), year_counts.values, marker="", linestyle="-")
+    for i, value in enumerate(year_counts.values):
+        plt.text(i, value + max(year_counts.values) * 0.02, str(value), ha="center", fontsize=10, color="black")
+    plt.xlabel("Year-Quarter")
+    plt.ylabel("Number of New Stations")
+    plt.title("Yearly Trend of EV Charging Stations Openings")
+    plt.xticks(rotation=45)
+    plt.grid(True)
+    return fig
+
+
+# Number of Stations vs Number of EV Registrations by State
+# Data comes from https://afdc.energy.gov/data/10962
+
+EV_REGISTRATION_BY_STATE = {
+    "AL": 13047, "AK": 2697, "AZ": 89798, "AR": 7108, "CA": 1256646,
+    "CO": 90083, "CT": 31557, "DL": 8435, "DC": 8066, "FL": 254878,
+    "GA": 92368, "HI": 25565, "ID": 8501, "IL": 99573, "IN": 26101,
+    "IO": 9031, "KS": 11271, "KT": 11617, "LA": 8150, "ME": 7377,
+    "MD": 72139, "MA": 73768, "MI": 50284, "MN": 37050, "MS": 3590,
+    "MO": 26861, "MT": 4608, "NE": 6920, "NV": 47361, "NH": 9861,
+    "NJ": 134753, "NM": 10276, "NY": 131250, "NC": 70164, "ND": 959,
+    "OH": 50393, "OK": 22843, "OR": 64361, "PA": 70154, "RI": 6396,
+    "SC": 20873, "SD": 1675, "TN": 33221, "TX": 230125, "UT": 39998,
+    "VT": 7816, "VA": 84936, "WA": 152101, "WV": 2758, "WI": 24943, "WY": 1139
+}
+
+
+def _registrations_vs_stations(cube, ev_registration_by_state, title):
+    import matplotlib.pyplot as plt
+
+    state_charging_counts = cube.counts("State")
+    charging_stations_df = pd.DataFrame({"State": state_charging_counts.index, "Charging_Stations": state_charging_counts.values})
+    ev_counts_df = pd.DataFrame(list(ev_registration_by_state.items()), columns=["State", "EV_Count"])
+    merged_df = pd.merge(ev_counts_df, charging_stations_df, on="State", how="inner")
+
+    merged_df["EV/Charging Ratio"] = merged_df["EV_Count"] / merged_df["Charging_Stations"]
+
+    fig, ax1 = plt.subplots(figsize=(15, 6))
+
+    ax1.bar(merged_df["State"], np.log1p(merged_df["EV_Count"]), color='b', alpha=0.6, label="EV Count (log)")
+    ax1.set_xlabel("State")
+    ax1.set_ylabel("Log(Number of EVs)", color='b')
+    ax1.tick_params(axis='y', labelcolor='b')
+
+    ax2 = ax1.twinx()
+    ax2.bar(merged_df["State"], merged_df["Charging_Stations"], color='#BA0C2F', alpha=0.4, label="Charging Stations")
+    ax2.set_ylabel("Number of Charging Stations", color='#BA0C2F')
+    ax2.tick_params(axis='y', labelcolor='#BA0C2F')
+
+    plt.xticks(rotation=90)
+
+    plt.title(title)
+
+    fig.legend(loc="upper left", bbox_to_anchor=(0.1, 0.9))
+    return fig
+
+
+@register("ev_vs_stations_by_state", "Deeper Distribution", tags=["deeper", "registrations", "state"])
+def ev_vs_stations_by_state(cube):
+    return _registrations_vs_stations(cube, EV_REGISTRATION_BY_STATE,
+                                      "Comparison of EV Counts and Charging Stations by State (Log Scale)")
+
+
+@register("ev_vs_stations_by_state_no_CA", "Deeper Distribution", tags=["deeper", "registrations", "state"])
+def ev_vs_stations_by_state_no_ca(cube):
+    registrations = {state: count for state, count in EV_REGISTRATION_BY_STATE.items() if state != "CA"}
+    return _registrations_vs_stations(cube, registrations,
+                                      "Comparison of EV Counts and Charging Stations by State Excluding CA (Log Scale)")
+
+
+# California
+
+@register("ev_stations_by_county_california", "California", tags=["california", "county"])
+def ev_stations_by_county_california(df):
+    import matplotlib.pyplot as plt
+
+    county_station_counts = state_county_counts(df, "CA")
+    county_station_counts = county_station_counts[county_station_counts > 0]
+
+    fig = plt.figure(figsize=(12, 6))
+    plt.bar(county_station_counts.index, county_station_counts.values, color="#BA0C2F")
+    plt.xlabel("County")
+    plt.ylabel("Number of Charging Stations")
+    plt.title("EV Charging Stations Distribution by County in California")
+    plt.xticks(rotation=90)
+    plt.grid(axis="y", linestyle="--", alpha=0.7)
+    return fig
+
+
+@register("ev_stations_density_by_county_california_map", "California", tags=["california", "county", "map"])
+def ev_stations_density_by_county_california_map(df, path):
+    import geopandas as gpd
+    import matplotlib.pyplot as plt
+
+    with stage("read_file", source=COUNTY_BOUNDARIES["CA"]):
+        california_map = gpd.read_file(boundary_path(COUNTY_BOUNDARIES["CA"]))
+
+    county_station_counts = state_county_counts(df, "CA").reset_index()
+    county_station_counts.columns = ["County", "Charging_Stations"]
+
+    all_counties = pd.DataFrame({"County": california_map["name"]})
+    county_station_counts = all_counties.merge(county_station_counts, on="County", how="left").fillna(0)
+
+    california_map = california_map.merge(county_station_counts, left_on="name", right_on="County", how="left")
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    california_map.plot(column="Charging_Stations", cmap="OrRd", linewidth=0.8, edgecolor="black", legend=True, ax=ax)
+    plt.title("EV Charging Stations Density by County in California")
+    plt.axis("off")
+    return fig
+
+
+# Station Level vs Build Year By Ken Ning
+
+@register("stations_by_level_vs_time_no_2022", "Deeper Distribution", tags=["deeper", "trend", "level"])
+def stations_by_level_vs_time(cube):
+    import matplotlib.pyplot as plt
+    from ev_cube import EVSE_COLUMNS
+
+    df_open_year = pd.DataFrame({column: cube.openings(column, freq="Y") for column in EVSE_COLUMNS})
+    df_open_year.index = df_open_year.index.year
+    df_open_year = df_open_year[df_open_year.index != 2022]
+
+    fig = plt.figure(figsize=(12, 6))
+    plt.plot(df_open_year.index, df_open_year["EV Level1 EVSE Num"], marker="o", label="Level 1 Charging Stations", linestyle="-")
+    plt.plot(df_open_year.index, df_open_year["EV Level2 EVSE Num"], marker="s", label="Level 2 Charging Stations", linestyle="-")
+    plt.plot(df_open_year.index, df_open_year["EV DC Fast Count"], marker="^", label="DC Fast Charging Stations", linestyle="-")
+
+    plt.xlabel("Year", fontsize=12)
+    plt.ylabel("Number of Charging Stations", fontsize=12)
+    plt.title("Growth of EV Charging Stations by Level Over Time (Excluding 2022)", fontsize=14)
+    plt.legend()
+    plt.grid(True, linestyle="--", alpha=0.6)
+    return fig
+
+
+# Postal Code Search by Ken Ning
+# Moved to search_app.py, run it with: streamlit run search_app.py
+
+# Map By Ken Ning
+
+CHARGING_COLORS = {
+    "Level 1": "blue",
+    "Level 2": "green",
+    "DC Fast": "red"
+}
+
+
+@register("charger_level_access_map", "Map Distribution", tags=["map", "level", "access"])
+def charger_level_access_map(stations):
+    import matplotlib.pyplot as plt
+
+    station_styles = {f"{charger_type} ({access})": dict(s=10 if marker == "o" else 20, color=color, alpha=0.6, marker=marker, label=f"{charger_type} ({access})")
+                      for charger_type, color in CHARGING_COLORS.items()
+                      for access, marker in [("Public", "o"), ("Private", "*")]}
+    inset_styles = {charger_type: dict(s=5, color=color, alpha=0.6, marker="o") for charger_type, color in CHARGING_COLORS.items()}
+
+    fig = plt.figure(figsize=(14, 8))
+    ax_main = fig.add_subplot(1, 1, 1)
+
+    stations.background(ax_main, "conus", style="light")
+    stations.scatter(ax_main, "conus", ["level", "access"], lambda level, access: f"{level} ({access})", station_styles)
+
+    ax_ak = plt.axes([0.02, 0.05, 0.2, 0.2])
+    stations.background(ax_ak, "alaska", style="light", width=400)
+    stations.scatter(ax_ak, "alaska", ["level"], lambda level: level, inset_styles)
+
+    ax_hi = plt.axes([0.25, 0.05, 0.15, 0.15])
+    stations.background(ax_hi, "hawaii", style="light", width=400)
+    stations.scatter(ax_hi, "hawaii", ["level"], lambda level: level, inset_styles)
+
+    ax_legend = plt.axes([0.72, 0.8, 0.2, 0.15])
+    ax_legend.axis("off")
+    legend_patches = [plt.Line2D([0], [0], marker="o", color="w", markerfacecolor=color, markersize=8, label=f"{charger_type} Public") for charger_type, color in CHARGING_COLORS.items()]
+    legend_patches += [plt.Line2D([0], [0], marker="*", color="w", markerfacecolor=color, markersize=10, label=f"{charger_type} Private") for charger_type, color in CHARGING_COLORS.items()]
+    ax_legend.legend(handles=legend_patches, loc="center", fontsize=9, title="Charger Types")
+
+    plt.suptitle("全美电动汽车充电站分布（区分充电级别 & 访问权限）", fontsize=14)
+    return fig
+
+
+# Map By Rocky
+
+COLOR_MAPPING = {
+    "Level 1": "red",
+    "Level 2": "blue",
+    "DC Fast": "green"
+}
+
+STATE_LABELS = {
+    "AL": (32.8, -86.8), "AZ": (34.0, -111.0), "AR": (34.8, -92.2),
+    "CA": (37.2, -119.4), "CO": (39.0, -105.5), "CT": (41.6, -72.7), "DE": (39.0, -75.5),
+    "FL": (27.8, -81.6), "GA": (32.6, -83.4), "ID": (44.0, -114.0),
+    "IL": (40.0, -89.0), "IN": (39.8, -86.1), "IA": (42.0, -93.5), "KS": (38.5, -98.0),
+    "KY": (37.5, -85.0), "LA": (30.9, -91.1), "ME": (45.5, -69.0), "MD": (39.0, -76.7),
+    "MA": (42.3, -71.5), "MI": (44.3, -85.4), "MN": (46.4, -94.6), "MS": (32.7, -89.7),
+    "MO": (38.5, -92.5), "MT": (47.0, -110.0), "NE": (41.5, -99.7), "NV": (39.0, -116.5),
+    "NH": (43.8, -71.6), "NJ": (40.2, -74.7), "NM": (34.5, -106.0), "NY": (42.9, -75.6),
+    "NC": (35.5, -79.4), "ND": (47.5, -100.5), "OH": (40.3, -82.8), "OK": (35.6, -97.5),
+    "OR": (44.0, -120.5), "PA": (41.2, -77.2), "RI": (41.7, -71.5), "SC": (33.9, -81.2),
+    "SD": (44.5, -100.3), "TN": (35.9, -86.6), "TX": (31.5, -99.3), "UT": (39.4, -111.6),
+    "VT": (44.0, -72.7), "VA": (37.8, -78.2), "WA": (47.4, -120.7), "WV": (38.6, -80.5),
+    "WI": (44.6, -89.6), "WY": (43.0, -107.5)
+}
+
+
+def _layer_colors():
+    # Every station is drawn: points are binned into pixels per level/access
+    # class (private in a darker shade) instead of scattering a 10% sample
+    from ev_raster import darker
+
+    return {f"{charger} ({access})": shade
+            for charger, color in COLOR_MAPPING.items()
+            for access, shade in (("Public", color), ("Private", darker(color)))}
+
+
+@register("map_distribution", "Map Distribution", tags=["map", "level", "access"])
+def map_distribution(stations):
+    import matplotlib.pyplot as plt
+    from ev_raster import darker
+
+    layer_colors = _layer_colors()
+
+    fig, ax_main = plt.subplots(figsize=(12, 8))
+    m_main = stations.background(ax_main, "conus_wide", style="plain")
+
+    stations.density(ax_main, "conus_wide", ["level", "access"], lambda level, access: f"{level} ({access})", layer_colors, width=1200)
+
+    for state, (lat, lon) in STATE_LABELS.items():
+        x, y = m_main(lon, lat)
+        ax_main.text(x, y, state, fontsize=10, fontweight='bold', ha='center', va='center', color='black')
+
+    ax_alaska = fig.add_axes([0.104, 0.106, 0.22, 0.22])
+    ax_hawaii = fig.add_axes([0.264, 0.106, 0.15,0.15])
+
+    m_alaska = stations.background(ax_alaska, "alaska", style="plain", width=400)
+    stations.density(ax_alaska, "alaska", ["level", "access"], lambda level, access: f"{level} ({access})", layer_colors, width=300)
+
+    x_ak, y_ak = m_alaska(-152.0, 63.5)
+    ax_alaska.text(x_ak, y_ak, "AK", fontsize=10, fontweight='bold', ha='center', va='center', color='black')
+
+    m_hawaii = stations.background(ax_hawaii, "hawaii", style="plain", width=400)
+    stations.density(ax_hawaii, "hawaii", ["level", "access"], lambda level, access: f"{level} ({access})", layer_colors, width=300)
+
+    x_hi, y_hi = m_hawaii(-157.5, 20)
+    ax_hawaii.text(x_hi,y_hi, "HI", fontsize=10, fontweight='bold', ha='center', va='center', color='black')
+
+    legend_ax = fig.add_axes([0.75, 0.13, 0.2, 0.2])
+    legend_ax.axis("off")
+
+    legend_ax.text(0.1, 0.9, "Charger Type", fontsize=12, fontweight="bold")
+    legend_ax.text(0.1, 0.75, "■ Level 1 (Public)", fontsize=10, color="red")
+    legend_ax.text(0.1, 0.65, "■ Level 1 (Private)", fontsize=10, color=darker("red"))
+    legend_ax.text(0.1, 0.50, "■ Level 2 (Public)", fontsize=10, color="blue")
+    legend_ax.text(0.1, 0.40, "■ Level 2 (Private)", fontsize=10, color=darker("blue"))
+    legend_ax.text(0.1, 0.25, "■ DC Fast (Public)", fontsize=10, color="green")
+    legend_ax.text(0.1, 0.15, "■ DC Fast (Private)", fontsize=10, color=darker("green"))
+
+    ax_main.set_title("EV Charging Stations in the USA with Standardized Alaska & Hawaii Placement", fontsize=14)
+    return fig
+
+
+# Map With Types and Locations by Rocky
+
+@register("charger_type_access_map", "Map Distribution", tags=["map", "level", "access"])
+def charger_type_access_map(stations):
+    import matplotlib.patches as mpatches
+    import matplotlib.pyplot as plt
+
+    layer_colors = _layer_colors()
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+
+    stations.background(ax, "conus", style="plain")
+    stations.density(ax, "conus", ["level", "access"], lambda level, access: f"{level} ({access})", layer_colors, width=1200)
+
+    legend_handles = [mpatches.Patch(color=color, label=layer) for layer, color in layer_colors.items()]
+
+    ax.set_title("EV Charging Stations in the USA by Charger Type & Access Type", fontsize=14)
+    ax.legend(handles=legend_handles, title="Charger Type & Access Type", loc="upper right", fontsize=10)
+    return fig
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the report figures without a display")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--figures", nargs="*", help="Figure names (default: all)")
+    parser.add_argument("--tags", nargs="*", help="Also render every figure with one of these tags")
+    parser.add_argument("--format", nargs="*", default=["png"], choices=["png", "svg", "pdf"])
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Draw every figure even if a cached copy is current")
+    parser.add_argument("--list", action="store_true", help="List the registered figures and exit")
+    parser.add_argument("--trace", help="Write per-stage timings to this file (.json: Chrome trace, else JSON lines)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.figures or ()) - set(FIGURES))
+    if unknown:
+        parser.error(f"unknown figure: {', '.join(unknown)}; choose from {', '.join(FIGURES)}")
+    known_tags = set().union(*(spec.tags for spec in FIGURES.values()))
+    unknown = sorted(set(args.tags or ()) - known_tags)
+    if unknown:
+        parser.error(f"unknown tag: {', '.join(unknown)}; choose from {', '.join(sorted(known_tags))}")
+
+    if args.list:
+        for spec in FIGURES.values():
+            print(f"{spec.name:50} {spec.folder:22} {', '.join(sorted(spec.tags))}")
+    else:
+        import matplotlib
+        matplotlib.use("Agg")
+
+        if args.trace:
+            TRACER.enable()
+        report = render(select(args.figures, args.tags), FigureInputs(args.path), args.out, args.format,
+                        use_cache=not args.no_cache)
+        for name in report.rendered:
+            print(f"rendered {name}")
+        print(report.summary())
+        if args.trace:
+            print(f"trace written to {TRACER.export(args.trace)}")
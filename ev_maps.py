@@ -0,0 +1,100 @@
+'''
+Shared renderer for the station map layers.
+
+StationMap wraps the coordinate store and the cached basemap backgrounds:
+
+- project(extent) projects every station once per extent and keeps the ones
+  inside the map bounds;
+- groups(extent, by) partitions those stations by their (level, access,
+  network) codes with a single argsort, CSR style like ZipIndex;
+- scatter() / density() merge the groups into named layers and draw one
+  collection (or one density image) per layer.
+
+Every map variant then reads:
+
+    stations = StationMap(coords)
+    m = stations.background(ax, "conus")
+    stations.scatter(ax, "conus", ("level", "access"), lambda level, access: level, styles)
+'''
+
+import numpy as np
+
+from ev_basemaps import draw_background, get_basemap
+from ev_raster import draw_density
+from ev_trace import traced
+
+FIELDS = {"level": ("Charger Type", 1), "access": ("Access Type", 2), "network": ("EV Network", 3)}
+
+
+class StationMap:
+    def __init__(self, coords):
+        self.coords = coords
+        self._projected = {}
+        self._groups = {}
+
+    def background(self, ax, extent="conus", style="light", width=1600):
+        return draw_background(ax, extent, style, width)
+
+    @traced()
+    def project(self, extent):
+        # (x, y, positions) of the stations inside the extent, in map units;
+        # positions index the coordinate store
+        if extent not in self._projected:
+            m = get_basemap(extent)
+            x, y = m(np.asarray(self.coords.lon, dtype="float64"), np.asarray(self.coords.lat, dtype="float64"))
+            inside = (x >= m.llcrnrx) & (x <= m.urcrnrx) & (y >= m.llcrnry) & (y <= m.urcrnry)
+            positions = np.flatnonzero(inside)
+            self._projected[extent] = (x[positions], y[positions], positions)
+        return self._projected[extent]
+
+    def groups(self, extent, by=("level", "access")):
+        # {label tuple: indexes into project(extent)}, None for missing labels
+        key = (extent, tuple(by))
+        if key not in self._groups:
+            positions = self.project(extent)[2]
+            fields = [FIELDS[name] for name in by]
+            # Codes are -1 when missing, so shift them to start at 0
+            codes = [np.asarray(self.coords.codes[row])[positions] + 1 for _, row in fields]
+            shape = tuple(len(self.coords.labels[field]) + 1 for field, _ in fields)
+            flat = np.ravel_multi_index(codes, shape) if codes else np.zeros(len(positions), dtype=np.int64)
+            order = np.argsort(flat, kind="stable")
+            starts = np.flatnonzero(np.diff(flat[order], prepend=-1)) if len(order) else np.empty(0, dtype=np.int64)
+            groups = {}
+            for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+                index = np.unravel_index(flat[order[start]], shape)
+                labels = tuple(self.coords.labels[field][i - 1] if i > 0 else None
+                               for (field, _), i in zip(fields, index))
+                groups[labels] = order[start:end]
+            self._groups[key] = groups
+        return self._groups[key]
+
+    def layers(self, extent, by, layer, names):
+        # Indexes per layer name, in the order of names. layer(*labels) names
+        # the layer of each group, None to leave the group out.
+        members = {name: [] for name in names}
+        for labels, index in self.groups(extent, by).items():
+            name = layer(*labels)
+            if name in members:
+                members[name].append(index)
+        return {name: np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+                for name, parts in members.items()}
+
+    @traced()
+    def scatter(self, ax, extent, by, layer, styles):
+        # One scatter collection per layer; styles: {layer name: scatter kwargs}
+        x, y, _ = self.project(extent)
+        collections = {}
+        for name, index in self.layers(extent, by, layer, styles).items():
+            collections[name] = ax.scatter(x[index], y[index], **styles[name])
+        return collections
+
+    @traced()
+    def density(self, ax, extent, by, layer, colors, width=1200, radius=1):
+        # One density image over all layers; colors: {layer name: color}
+        x, y, _ = self.project(extent)
+        group_ids = np.full(len(x), -1, dtype=np.int64)
+        for i, index in enumerate(self.layers(extent, by, layer, colors).values()):
+            group_ids[index] = i
+        m = get_basemap(extent)
+        bounds = (m.llcrnrx, m.urcrnrx, m.llcrnry, m.urcrnry)
+        return draw_density(ax, x, y, bounds, group_ids, list(colors.values()), width, radius)
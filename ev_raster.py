@@ -0,0 +1,78 @@
+'''
+Rasterized density maps for the station layers.
+
+Instead of scattering a random 10% sample, every projected station is binned
+into a pixel grid per class (charger level x access) with one np.bincount,
+and the grids are shaded into a single RGBA image. Render time depends on the
+image size rather than the station count, and no station is dropped.
+'''
+
+import numpy as np
+
+
+def rasterize(x, y, bounds, width, height, groups=None, n_groups=1):
+    # Counts per (group, row, col). bounds = (x0, x1, y0, y1) in map units;
+    # row 0 is the top of the image. Points outside bounds or with group < 0
+    # are skipped.
+    x0, x1, y0, y1 = bounds
+    col = np.floor((np.asarray(x) - x0) * (width / (x1 - x0))).astype(np.int64)
+    row = np.floor((y1 - np.asarray(y)) * (height / (y1 - y0))).astype(np.int64)
+    groups = np.zeros(len(col), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+    keep = (col >= 0) & (col < width) & (row >= 0) & (row < height) & (groups >= 0) & (groups < n_groups)
+    flat = (groups[keep] * height + row[keep]) * width + col[keep]
+    counts = np.bincount(flat, minlength=n_groups * height * width)
+    return counts.reshape(n_groups, height, width)
+
+
+def spread(counts, radius=1):
+    # Box-sum each pixel with its neighbours so single stations stay visible
+    if radius <= 0:
+        return counts
+    size = 2 * radius + 1
+    padded = np.pad(counts, [(0, 0), (radius, radius), (radius, radius)])
+    out = np.zeros_like(counts)
+    height, width = counts.shape[1:]
+    for dy in range(size):
+        for dx in range(size):
+            out += padded[:, dy:dy + height, dx:dx + width]
+    return out
+
+
+def shade(counts, colors, min_alpha=0.35):
+    # Blend group colors by their share of each pixel; opacity follows
+    # log(total count), so dense metros do not swamp sparse areas
+    from matplotlib.colors import to_rgb
+
+    rgb = np.array([to_rgb(color) for color in colors])
+    total = counts.sum(axis=0)
+    image = np.zeros(total.shape + (4,))
+    filled = total > 0
+    if not filled.any():
+        return image
+    mix = np.tensordot(counts, rgb, axes=(0, 0))
+    image[..., :3][filled] = mix[filled] / total[filled][:, None]
+    alpha = np.log1p(total) / np.log1p(total.max())
+    image[..., 3] = np.where(filled, min_alpha + (1 - min_alpha) * alpha, 0)
+    return image
+
+
+def density_image(x, y, bounds, groups, colors, width, radius=1):
+    # Projected points to (image, bounds) for imshow; the height follows the
+    # aspect ratio of bounds
+    height = max(1, round(width * (bounds[3] - bounds[2]) / (bounds[1] - bounds[0])))
+    counts = rasterize(x, y, bounds, width, height, groups, len(colors))
+    return shade(spread(counts, radius), colors), bounds
+
+
+def draw_density(ax, x, y, bounds, groups, colors, width=1200, radius=1):
+    image, bounds = density_image(x, y, bounds, groups, colors, width, radius)
+    ax.imshow(image, extent=bounds, origin="upper", interpolation="nearest", zorder=1)
+    ax.set_xlim(bounds[0], bounds[1])
+    ax.set_ylim(bounds[2], bounds[3])
+    return image
+
+
+def darker(color, factor=0.55):
+    from matplotlib.colors import to_rgb
+
+    return tuple(channel * factor for channel in to_rgb(color))
@@ -0,0 +1,152 @@
+'''
+Incremental refresh of the cache after a new AFDC export.
+
+Every cached table is saved with its station keys (ID and a hash of the typed
+source row, see row_keys in ev_data). When the CSV is replaced by a new
+export, refresh() diffs the new keys against the previous version's keys and
+only recomputes what changed:
+
+- derived columns are computed for inserted and updated rows only, the rest
+  of the table is reused from the previous Feather cache;
+- the aggregation cube subtracts the removed/updated rows and adds the
+  inserted/updated ones (state, network, owner and open-date roll-ups);
+- county polygon joins run for inserted/updated rows only.
+
+City and county counts are value_counts over the categorical codes of the
+refreshed table. The coordinate store is rebuilt from the table on first
+use. Without a previous cache, or with missing or duplicate IDs, everything
+is rebuilt as usual.
+
+Usage: python ev_refresh.py [path/to/export.csv]
+'''
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from ev_cube import StationCube
+from ev_data import (COUNTY_BOUNDARIES, CSV_PATH, STATION_SCHEMA, add_derived_columns, apply_schema, boundary_path,
+                     data_version, load_stations, previous_version, read_frame_cache, read_keys, read_stations_csv,
+                     row_keys, write_frame_cache, write_keys)
+
+
+class StationDelta:
+    # Row positions of the changes between two versions of the export.
+    # Kept and updated rows come as aligned (old, new) position arrays.
+    def __init__(self, old_keys, new_keys):
+        old_ids, old_hashes = old_keys
+        new_ids, new_hashes = new_keys
+        order = np.argsort(old_ids, kind="stable")
+        sorted_ids = old_ids[order]
+        position = np.minimum(np.searchsorted(sorted_ids, new_ids), max(len(sorted_ids) - 1, 0))
+        found = (sorted_ids[position] == new_ids) if len(sorted_ids) else np.zeros(len(new_ids), dtype=bool)
+
+        matched_new = np.flatnonzero(found)
+        matched_old = order[position[found]]
+        same = old_hashes[matched_old] == new_hashes[matched_new]
+        self.kept_old, self.kept_new = matched_old[same], matched_new[same]
+        self.updated_old, self.updated_new = matched_old[~same], matched_new[~same]
+        self.inserted = np.flatnonzero(~found)
+        self.removed = np.setdiff1d(np.arange(len(old_ids)), matched_old)
+
+    @property
+    def old_rows(self):
+        # Rows of the previous table that no longer hold
+        return np.union1d(self.removed, self.updated_old)
+
+    @property
+    def new_rows(self):
+        # Rows of the new export that have to be computed
+        return np.union1d(self.inserted, self.updated_new)
+
+    def summary(self):
+        return {"kept": len(self.kept_new), "inserted": len(self.inserted),
+                "updated": len(self.updated_new), "removed": len(self.removed)}
+
+
+def _unique_ids(ids):
+    return bool((ids >= 0).all()) and len(np.unique(ids)) == len(ids)
+
+
+def _tidy_categories(df):
+    # Same categories a fresh parse would give: sorted, only the ones in use
+    for column, dtype in STATION_SCHEMA.items():
+        if dtype == "category" and column in df.columns:
+            values = df[column] if df[column].dtype == "category" else df[column].astype("category")
+            df[column] = values.cat.remove_unused_categories()
+    return df
+
+
+def _refresh_cube(path, old_version, old_df, changed):
+    cube = StationCube.load(path, old_version)
+    if cube is None:
+        return
+    cube.subtract(StationCube.from_frame(old_df)).merge(StationCube.from_frame(changed)).save(path)
+
+
+def _refresh_regions(path, old_version, delta, changed, rows):
+    try:
+        from ev_regions import read_state_region_codes, state_region_codes, write_state_region_codes
+    except ImportError:  # No shapely: counties come from the ZIP3 table
+        return
+    for state, boundary in COUNTY_BOUNDARIES.items():
+        boundary = boundary_path(boundary)
+        if not os.path.exists(boundary):
+            continue
+        cached = read_state_region_codes(path, state, boundary, old_version)
+        if cached is None:
+            continue
+        old_codes, names = cached
+        codes = np.full(rows, -1, dtype=np.int16)
+        codes[delta.kept_new] = old_codes[delta.kept_old]
+        codes[delta.new_rows] = state_region_codes(changed, state, boundary)[0]
+        write_state_region_codes(path, state, boundary, codes, names)
+
+
+def refresh(path=CSV_PATH):
+    # Bring the cache in line with the CSV. Returns the StationDelta that was
+    # applied, or None when the cache had to be rebuilt from scratch.
+    old_version = previous_version(path)
+    new_version = data_version(path)
+    old_keys = read_keys(path, old_version) if old_version is not None else None
+    old_df = read_frame_cache(path, "stations", old_version) if old_keys is not None else None
+    if old_df is None:
+        load_stations(path)
+        return None
+    if old_version == new_version:
+        return StationDelta(old_keys, old_keys)
+
+    raw = read_stations_csv(path)
+    new_keys = row_keys(raw)
+    if not (_unique_ids(old_keys[0]) and _unique_ids(new_keys[0])):
+        load_stations(path)
+        return None
+
+    delta = StationDelta(old_keys, new_keys)
+    changed = add_derived_columns(raw.iloc[delta.new_rows].reset_index(drop=True))
+
+    # Kept rows from the previous table plus the recomputed ones, in the
+    # row order of the new export
+    df = pd.concat([old_df.iloc[delta.kept_old], changed], ignore_index=True)
+    order = np.argsort(np.concatenate([delta.kept_new, delta.new_rows]), kind="stable")
+    df = _tidy_categories(apply_schema(df.iloc[order].reset_index(drop=True)))
+
+    write_keys(*new_keys, path)
+    write_frame_cache(df, path, "stations")
+    _refresh_cube(path, old_version, old_df.iloc[delta.old_rows], changed)
+    _refresh_regions(path, old_version, delta, changed, len(df))
+    return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the cache for a new export, recomputing only changed stations")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    args = parser.parse_args()
+
+    delta = refresh(args.path)
+    if delta is None:
+        print("No usable previous cache, rebuilt everything")
+    else:
+        print(", ".join(f"{count} {name}" for name, count in delta.summary().items()))
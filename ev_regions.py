@@ -0,0 +1,124 @@
+'''
+Point-in-polygon region assignment for the station table.
+
+County (or any other region) boundaries are read from a GeoJSON file, one
+feature per region, named by a feature property. RegionIndex puts the
+polygons in a shapely STRtree and joins all points in one bulk query, so the
+work is a bounding-box lookup plus exact tests against the few candidate
+polygons per point, all in C.
+
+Assignments are cached in .ev_cache/ per dataset version and boundary file
+version, so the join only runs when either of them changes. COUNTY_BOUNDARIES
+in ev_data lists the boundary file per state; add a state by adding its file.
+'''
+
+import functools
+import json
+import os
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+from ev_data import CSV_PATH, boundary_path, cache_path, county_label, data_version, prune_cache, recode
+from ev_trace import traced
+
+
+class RegionIndex:
+    def __init__(self, names, geometries):
+        self.names = list(names)
+        self.geometries = np.asarray(geometries, dtype=object)
+        shapely.prepare(self.geometries)
+        self.tree = shapely.STRtree(self.geometries)
+
+    @classmethod
+    def from_geojson(cls, path, name_property="name"):
+        with open(path) as f:
+            features = json.load(f)["features"]
+        return cls([feature["properties"][name_property] for feature in features],
+                   [shape(feature["geometry"]) for feature in features])
+
+    def assign(self, lon, lat):
+        # Index of the region containing each point, -1 when outside every
+        # region or missing. Points on a shared border go to the first region.
+        lon = np.asarray(lon, dtype="float64")
+        lat = np.asarray(lat, dtype="float64")
+        codes = np.full(len(lon), len(self.names), dtype=np.int64)
+        valid = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+        points, regions = self.tree.query(shapely.points(lon[valid], lat[valid]), predicate="intersects")
+        np.minimum.at(codes, valid[points], regions)
+        codes[codes == len(self.names)] = -1
+        return codes
+
+
+def _coordinates(df):
+    return (df["Longitude"].to_numpy(dtype="float64", na_value=np.nan),
+            df["Latitude"].to_numpy(dtype="float64", na_value=np.nan))
+
+
+@functools.lru_cache(maxsize=None)
+def load_region_index(boundary, name_property="name"):
+    return RegionIndex.from_geojson(boundary, name_property)
+
+
+@traced()
+def state_region_codes(df, state, boundary, name_property="name"):
+    # (codes per table row, region names) for the stations of one state
+    index = load_region_index(boundary, name_property)
+    codes = np.full(len(df), -1, dtype=np.int16)
+    in_state = np.flatnonzero((df["State"] == state).to_numpy(dtype=bool, na_value=False))
+    lon, lat = _coordinates(df)
+    codes[in_state] = index.assign(lon[in_state], lat[in_state])
+    return codes, index.names
+
+
+def _regions_target(path, state, boundary, version=None):
+    return cache_path(path, f"regions_{state}", f".{data_version(boundary)[:16]}.npz", version)
+
+
+def read_state_region_codes(path, state, boundary, version=None):
+    target = _regions_target(path, state, boundary, version)
+    if not os.path.exists(target):
+        return None
+    with np.load(target) as cached:
+        return cached["codes"], list(cached["names"])
+
+
+def write_state_region_codes(path, state, boundary, codes, names):
+    target = _regions_target(path, state, boundary)
+    np.savez(target + ".tmp.npz", codes=codes, names=np.array(names, dtype=str))
+    os.replace(target + ".tmp.npz", target)
+    prune_cache(path, f"regions_{state}", keep=target)
+
+
+def load_state_region_codes(path, df, state, boundary, name_property="name"):
+    # Same as state_region_codes, cached per CSV version and boundary version
+    cached = read_state_region_codes(path, state, boundary)
+    if cached is not None:
+        return cached
+    codes, names = state_region_codes(df, state, boundary, name_property)
+    write_state_region_codes(path, state, boundary, codes, names)
+    return codes, names
+
+
+@traced()
+def region_codes(df, boundaries, path=CSV_PATH, use_cache=True, name_property="name"):
+    # Combine the per-state joins into one set of codes over the sorted union
+    # of region names, qualified by state (see county_label).
+    # boundaries: {state: GeoJSON path}; relative paths are resolved next to
+    # the code (see boundary_path).
+    per_state = []
+    for state, boundary in boundaries.items():
+        boundary = boundary_path(boundary)
+        if use_cache:
+            state_codes, state_names = load_state_region_codes(path, df, state, boundary, name_property)
+        else:
+            state_codes, state_names = state_region_codes(df, state, boundary, name_property)
+        per_state.append((state_codes, [county_label(state, name) for name in state_names]))
+
+    names = sorted({name for _, state_names in per_state for name in state_names})
+    codes = np.full(len(df), -1, dtype=np.int16)
+    for state_codes, state_names in per_state:
+        assigned = state_codes >= 0
+        codes[assigned] = recode(state_codes[assigned], state_names, names)
+    return codes, names
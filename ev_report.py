@@ -0,0 +1,184 @@
+'''
+Per-state report pack.
+
+Renders the ev_stations.py charts for every state (owner mix, network mix,
+level growth, county choropleth where a boundary file exists, station map)
+into "Output Images/<state>/". States are spread over a process pool.
+
+The parent builds every cache first: the Feather table, the cube cells and
+the coordinate store (.npy files, see ev_cube and ev_coords). Workers then
+open both with np.load(mmap_mode="r") instead of loading the station table,
+so they share the parent's page cache, and each copies out only its state's
+cells (cube.where). Drawing uses Agg figures without pyplot. Besides state
+names and file lists, only the per-state county counts and the state code of
+each coordinate cross process boundaries, once per worker.
+
+Usage: python ev_report.py [path/to/export.csv] [--states CA WA] [--workers 8]
+'''
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from ev_coords import load_coordinates
+from ev_cube import EVSE_COLUMNS, OWNER_GROUPS, load_cube
+from ev_data import COUNTY_BOUNDARIES, CSV_PATH, boundary_path, load_stations, state_county_counts
+from ev_maps import StationMap
+
+OUTPUT_DIR = "Output Images"
+
+LEVEL_COLORS = {"Level 1": "blue", "Level 2": "green", "DC Fast": "red"}
+
+# Worker state, set once per process by attach()
+_shared = {}
+
+
+# Charts
+# Each takes an Axes and the shared data of one state.
+
+def owner_mix(ax, state_cube, state):
+    owners = state_cube.relabel("Owner Type Code", OWNER_GROUPS).rollup("Owner Type Code")
+    ax.bar(owners.index, owners.values, color=["#BA0C2F", "#4C72B0", "#55A868"][:len(owners)])
+    ax.set_title(f"Owner Type Distribution in {state}")
+    ax.set_ylabel("Number of Stations")
+
+
+def network_mix(ax, state_cube, state):
+    networks = state_cube.counts("EV Network").head(10)[::-1]
+    ax.barh(networks.index.astype(str), networks.values)
+    ax.set_title(f"Top EV Networks in {state}")
+    ax.set_xlabel("Number of Stations")
+
+
+def level_growth(ax, state_cube, state):
+    growth = pd.DataFrame({column: state_cube.openings(column, freq="Y") for column in EVSE_COLUMNS})
+    growth.index = growth.index.year
+    for column, marker, label in zip(EVSE_COLUMNS, "os^", ["Level 1", "Level 2", "DC Fast"]):
+        ax.plot(growth.index, growth[column], marker=marker, label=f"{label} Charging Stations")
+    ax.set_title(f"Growth of EV Charging Stations by Level in {state}")
+    ax.set_xlabel("Year")
+    ax.set_ylabel("Number of Charging Stations")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.6)
+
+
+def county_map(ax, counts, state, boundary):
+    # counts: stations per county name of the boundary file
+    import geopandas as gpd
+
+    counties = gpd.read_file(boundary)
+    counties["Charging_Stations"] = counties["name"].map(counts).fillna(0)
+    counties.plot(column="Charging_Stations", cmap="OrRd", linewidth=0.8, edgecolor="black", legend=True, ax=ax)
+    ax.set_title(f"EV Charging Stations Density by County in {state}")
+    ax.axis("off")
+
+
+def state_extent(lon, lat, pad=1.0):
+    # Whole-degree box around the bulk of a state's stations, so the cached
+    # background is reused between runs
+    lat_min, lat_max = np.nanpercentile(lat, [0.5, 99.5])
+    lon_min, lon_max = np.nanpercentile(lon, [0.5, 99.5])
+    return (max(float(np.floor(lat_min - pad)), -80.0), min(float(np.ceil(lat_max + pad)), 80.0),
+            max(float(np.floor(lon_min - pad)), -180.0), min(float(np.ceil(lon_max + pad)), 180.0))
+
+
+def station_map(ax, stations, state):
+    extent = state_extent(stations.coords.lon, stations.coords.lat)
+    stations.background(ax, extent, style="light", width=1200)
+    styles = {level: dict(s=6, color=color, alpha=0.6, marker="o", label=level) for level, color in LEVEL_COLORS.items()}
+    stations.scatter(ax, extent, ["level"], lambda level: level, styles)
+    ax.legend(title="Charger Type", loc="best", fontsize=9)
+    ax.set_title(f"EV Charging Stations in {state}")
+
+
+# Workers
+
+def attach(path, coord_states, state_labels, county_counts):
+    # Map the cached cube and coordinates once per worker process; the
+    # parent's aggregates replace the station table
+    import matplotlib
+    matplotlib.use("Agg")
+
+    _shared.update(cube=load_cube(path), coords=load_coordinates(path), coord_states=coord_states,
+                   state_labels=state_labels, county_counts=county_counts)
+
+
+def county_counts(df, states):
+    # {state: stations per county name} for the states with a boundary file
+    return {state: state_county_counts(df, state) for state in states}
+
+
+def _save(fig, target):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    FigureCanvasAgg(fig)
+    fig.savefig(target, dpi=100)
+    return target
+
+
+def render_state(state, out_dir=OUTPUT_DIR):
+    from matplotlib.figure import Figure
+
+    cube, coords = _shared["cube"], _shared["coords"]
+    target_dir = os.path.join(out_dir, state)
+    os.makedirs(target_dir, exist_ok=True)
+    state_cube = cube.where("State", [state])
+    written = []
+
+    for name, chart, size in [("owner_mix", owner_mix, (8, 6)), ("network_mix", network_mix, (10, 6)),
+                              ("level_growth", level_growth, (12, 6))]:
+        fig = Figure(figsize=size)
+        chart(fig.add_subplot(), state_cube, state)
+        fig.tight_layout()
+        written.append(_save(fig, os.path.join(target_dir, f"{name}.png")))
+
+    boundary = COUNTY_BOUNDARIES.get(state)
+    if boundary is not None and os.path.exists(boundary_path(boundary)):
+        boundary = boundary_path(boundary)
+        fig = Figure(figsize=(10, 10))
+        county_map(fig.add_subplot(), _shared["county_counts"][state], state, boundary)
+        written.append(_save(fig, os.path.join(target_dir, "county_map.png")))
+
+    labels = _shared["state_labels"]
+    in_state = _shared["coord_states"] == (labels.index(state) if state in labels else -2)
+    if in_state.any():
+        fig = Figure(figsize=(12, 8))
+        station_map(fig.add_subplot(), StationMap(coords.subset(in_state)), state)
+        written.append(_save(fig, os.path.join(target_dir, "station_map.png")))
+    return written
+
+
+def build_report_pack(path=CSV_PATH, out_dir=OUTPUT_DIR, states=None, workers=None):
+    # {state: written files}. Largest states go first to balance the pool.
+    df = load_stations(path)
+    cube = load_cube(path, df)
+    coords = load_coordinates(path, df)
+    counts = cube.counts("State")
+    states = list(counts.index) if states is None else sorted(states, key=lambda s: -counts.get(s, 0))
+
+    # State codes of the coordinates (-1 when missing) and county counts:
+    # small enough to hand every worker instead of the table
+    state_column = df["State"].astype("category")
+    coord_states = state_column.cat.codes.to_numpy()[coords.rows]
+    state_labels = [str(label) for label in state_column.cat.categories]
+    shared = (path, coord_states, state_labels,
+              county_counts(df, [state for state in states if state in COUNTY_BOUNDARIES]))
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=attach, initargs=shared) as pool:
+        results = pool.map(render_state, states, [out_dir] * len(states))
+        return dict(zip(states, results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the station charts for every state")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--states", nargs="*", help="Only these states (default: all)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    pack = build_report_pack(args.path, args.out, args.states, args.workers)
+    print(f"{sum(len(files) for files in pack.values())} images for {len(pack)} states in {args.out}/")
@@ -0,0 +1,371 @@
+'''
+Station search indexes for the Postal Code Search app.
+
+ZipIndex groups table rows by integer ZIP5 with a CSR layout: rows sorted by
+ZIP plus an offsets array over all 100000 ZIPs. An exact ZIP5 lookup or a
+ZIP3 prefix range is two array reads, independent of the dataset size.
+
+StationIndex answers k-nearest and radius queries with real great-circle
+distances. Stations are stored as 3-D unit vectors in a KD-tree, where the
+straight-line (chord) distance grows monotonically with the arc distance, so
+tree queries on chords give exact haversine neighbours. ZIP centroids are
+averaged from the station coordinates of each ZIP; a ZIP without stations
+falls back to the stations of its ZIP3 prefix, then to the prefix's point in
+the ZIP3 reference table, so every valid ZIP can be located.
+
+Build the index once per process with load_station_index and reuse it for
+every query.
+'''
+
+import functools
+
+import numpy as np
+import pandas as pd
+
+from ev_coords import load_coordinates
+from ev_data import CSV_PATH, ZIP3_COUNTIES, load_stations, zip5_values
+from ev_trace import traced
+
+EARTH_RADIUS = {"mi": 3958.8, "km": 6371.0}
+
+SEARCH_COLUMNS = ['ZIP', 'City', 'State', 'Station Name', 'Street Address', 'EV Level1 EVSE Num',
+                  'EV Level2 EVSE Num', 'EV DC Fast Count', 'EV Network']
+
+
+# ZIP Lookups
+
+def parse_zip(text):
+    # User input to an int ZIP5, None when it is not a ZIP
+    digits = str(text).strip().split("-")[0].split(".")[0]
+    if not digits.isdigit() or len(digits) > 5:
+        return None
+    return int(digits)
+
+
+class ZipIndex:
+    def __init__(self, zips):
+        # zips: float array of ZIP5 per table row, NaN when missing
+        valid = ~np.isnan(zips)
+        rows = np.flatnonzero(valid)
+        keys = zips[valid].astype(np.int32)
+        order = np.argsort(keys, kind="stable")
+        self.rows = rows[order]
+        self.offsets = np.zeros(100001, dtype=np.int64)
+        np.cumsum(np.bincount(keys, minlength=100000), out=self.offsets[1:])
+
+    @classmethod
+    @traced()
+    def from_frame(cls, df):
+        return cls(zip5_values(df))
+
+    def rows_for(self, zip_code):
+        zip_code = parse_zip(zip_code) if isinstance(zip_code, str) else zip_code
+        if zip_code is None or not 0 <= zip_code < 100000:
+            return self.rows[:0]
+        return self.rows[self.offsets[zip_code]:self.offsets[zip_code + 1]]
+
+    def rows_for_prefix(self, zip3):
+        # Every row whose ZIP starts with the three digits, e.g. 941 -> 94100-94199
+        zip3 = int(zip3)
+        if not 0 <= zip3 < 1000:
+            return self.rows[:0]
+        return self.rows[self.offsets[zip3 * 100]:self.offsets[zip3 * 100 + 100]]
+
+    def prefix_counts(self):
+        # Station count for each of the 1000 ZIP3 prefixes
+        return np.diff(self.offsets[::100])
+
+    def zips(self):
+        # Distinct ZIP5 values present, sorted
+        return np.flatnonzero(np.diff(self.offsets))
+
+
+def search_results(df, rows, distances=None, units="mi"):
+    # Result rows for display, ZIP zero-padded back to five digits
+    results = df.iloc[rows][SEARCH_COLUMNS].copy()
+    results["ZIP"] = results["ZIP"].astype("Int32").astype("string").str.zfill(5)
+    if distances is not None:
+        results[f"Distance ({units})"] = np.round(distances, 2)
+    return results
+
+
+# Nearest Stations
+
+def unit_vectors(lat, lon):
+    lat = np.radians(np.asarray(lat, dtype="float64"))
+    lon = np.radians(np.asarray(lon, dtype="float64"))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def chord_to_distance(chord, units="mi"):
+    return 2 * np.arcsin(np.clip(chord / 2, 0, 1)) * EARTH_RADIUS[units]
+
+
+def distance_to_chord(distance, units="mi"):
+    return 2 * np.sin(np.minimum(distance / EARTH_RADIUS[units], np.pi) / 2)
+
+
+def haversine(lat1, lon1, lat2, lon2, units="mi"):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype="float64")) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))) * EARTH_RADIUS[units]
+
+
+def _zip_points(df):
+    # Station positions with an int ZIP5, as a DataFrame
+    zips = zip5_values(df)
+    lat = df["Latitude"].to_numpy(dtype="float64", na_value=np.nan)
+    lon = df["Longitude"].to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~(np.isnan(zips) | np.isnan(lat) | np.isnan(lon))
+    return pd.DataFrame({"ZIP": zips[valid].astype(np.int32), "Latitude": lat[valid], "Longitude": lon[valid]})
+
+
+def zip_centroids(df):
+    # Mean station position per 5-digit ZIP, as a DataFrame indexed by int ZIP
+    return _zip_points(df).groupby("ZIP").mean()
+
+
+def zip3_centroids(df, lookup_path=ZIP3_COUNTIES):
+    # Mean station position per ZIP3 prefix, or the reference table's point
+    # for prefixes without stations, as a DataFrame indexed by int prefix
+    points = _zip_points(df)
+    stations = points[["Latitude", "Longitude"]].groupby(points["ZIP"] // 100).mean()
+    reference = pd.read_csv(lookup_path, usecols=["zip3", "lat", "lon"], dtype={"zip3": "int64"})
+    reference = reference.set_index("zip3").rename(columns={"lat": "Latitude", "lon": "Longitude"})
+    return stations.combine_first(reference.rename_axis("ZIP"))
+
+
+class StationIndex:
+    def __init__(self, lat, lon, rows, centroids=None, prefix_centroids=None):
+        self.rows = np.asarray(rows)
+        self.points = unit_vectors(lat, lon)
+        self.centroids = centroids
+        self.prefix_centroids = prefix_centroids
+
+    @functools.cached_property
+    def tree(self):
+        # Built on the first query, so loading the index (and locating ZIPs)
+        # does not import scipy
+        from scipy.spatial import cKDTree
+
+        return cKDTree(self.points)
+
+    @traced()
+    def nearest(self, lat, lon, k=5, units="mi"):
+        # k nearest stations as (distances, table rows), closest first
+        k = min(k, len(self.rows))
+        chords, positions = self.tree.query(unit_vectors(lat, lon), k=k)
+        chords, positions = np.atleast_1d(chords), np.atleast_1d(positions)
+        return chord_to_distance(chords, units), self.rows[positions]
+
+    @traced()
+    def within(self, lat, lon, radius, units="mi"):
+        # All stations within radius, as (distances, table rows), closest first
+        center = unit_vectors(lat, lon)
+        positions = np.asarray(self.tree.query_ball_point(center, distance_to_chord(radius, units)), dtype=np.int64)
+        chords = np.linalg.norm(self.points[positions] - center, axis=1)
+        order = np.argsort(chords, kind="stable")
+        return chord_to_distance(chords[order], units), self.rows[positions[order]]
+
+    def zip_centroid(self, zip_code):
+        # (lat, lon) of a ZIP: the mean of its stations, else of its ZIP3
+        # prefix (see zip3_centroids); None when the prefix is unknown too
+        zip_code = parse_zip(zip_code) if isinstance(zip_code, str) else zip_code
+        if zip_code is None:
+            return None
+        for centroids, key in [(self.centroids, zip_code), (self.prefix_centroids, zip_code // 100)]:
+            if centroids is not None and key in centroids.index:
+                lat, lon = centroids.loc[key, ["Latitude", "Longitude"]]
+                return lat, lon
+        return None
+
+    def nearest_to_zip(self, zip_code, k=5, units="mi"):
+        centroid = self.zip_centroid(zip_code)
+        if centroid is None:
+            return np.empty(0), np.empty(0, dtype=np.int64)
+        return self.nearest(*centroid, k=k, units=units)
+
+
+@traced()
+def load_station_index(path=CSV_PATH, df=None):
+    df = load_stations(path) if df is None else df
+    coords = load_coordinates(path, df)
+    return StationIndex(coords.lat, coords.lon, coords.rows, zip_centroids(df), zip3_centroids(df))
+
+
+# Filtered Radius and Box Queries
+
+# Filter keyword -> station table column
+FILTERS = {"network": "EV Network", "facility": "Facility Type", "owner": "Owner Type Code",
+           "access": "Access Type", "level": "Charger Type"}
+GRID_DEGREES = 0.05  # Cell side; about 5.5 km of latitude
+
+
+def wrap_longitude(lon):
+    # Longitude in [-180, 180)
+    return (lon + 180) % 360 - 180
+
+
+def lon_ranges(lon_min, lon_max):
+    # [lon_min, lon_max] as ranges within [-180, 180], split where it crosses
+    # the antimeridian (past +-180, or lon_min > lon_max); the whole circle
+    # when it spans 360 degrees or more
+    if lon_max - lon_min >= 360:
+        return [(-180.0, 180.0)]
+    low, high = wrap_longitude(lon_min), wrap_longitude(lon_max)
+    if lon_max >= lon_min and high == -180 and low > high:
+        high = 180.0  # lon_max on the antimeridian itself
+    if low <= high:
+        return [(low, high)]
+    return [(low, 180.0), (-180.0, high)]
+
+
+class GridIndex:
+    def __init__(self, lat, lon, rows, codes, labels, cell=GRID_DEGREES):
+        # lat, lon, rows: stations with coordinates and their table rows;
+        # codes: {filter: category codes aligned with them, -1 when missing};
+        # labels: {filter: [names]}
+        lat = np.asarray(lat, dtype="float64")
+        lon = np.asarray(lon, dtype="float64")
+        self.cell = cell
+        lat_range, lon_range = ((values.min(), values.max()) if len(values) else (0, 0) for values in (lat, lon))
+        self.lat0, self.lon0 = np.floor(lat_range[0] / cell) * cell, np.floor(lon_range[0] / cell) * cell
+        self.n_rows = int((lat_range[1] - self.lat0) // cell) + 1
+        self.n_cols = int((lon_range[1] - self.lon0) // cell) + 1
+        keys = self._cell_rows(lat) * self.n_cols + self._cell_cols(lon)
+        order = np.argsort(keys, kind="stable")
+        # Stations sorted by cell, so a run of cells in one grid row is one
+        # contiguous slice
+        self.keys = keys[order]
+        self.lat = lat[order]
+        self.lon = lon[order]
+        self.points = unit_vectors(self.lat, self.lon)
+        self.rows = np.asarray(rows)[order]
+        self.codes = {name: np.asarray(values)[order] for name, values in codes.items()}
+        self.labels = labels
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    @traced()
+    def from_frame(cls, df, cell=GRID_DEGREES):
+        lat = df["Latitude"].to_numpy(dtype="float64", na_value=np.nan)
+        lon = df["Longitude"].to_numpy(dtype="float64", na_value=np.nan)
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        codes, labels = {}, {}
+        for name, column in FILTERS.items():
+            values = df[column].astype("category")
+            codes[name] = values.cat.codes.to_numpy()[valid].astype(np.int16)
+            labels[name] = [str(label) for label in values.cat.categories]
+        return cls(lat[valid], lon[valid], np.flatnonzero(valid), codes, labels, cell)
+
+    def _cell_rows(self, lat):
+        return np.clip(((lat - self.lat0) // self.cell).astype(np.int64), 0, self.n_rows - 1)
+
+    def _cell_cols(self, lon):
+        return np.clip(((lon - self.lon0) // self.cell).astype(np.int64), 0, self.n_cols - 1)
+
+    def _runs(self, lat_min, lat_max, lon_ranges):
+        # (start, end) of the stations in the cells overlapping the box, one
+        # run per grid row and longitude range, found with two binary
+        # searches. Boxes past the grid are clamped to its edge cells (ranges
+        # entirely off it are skipped); callers test exactly.
+        lat_top = self.lat0 + self.n_rows * self.cell
+        lon_right = self.lon0 + self.n_cols * self.cell
+        if not len(self) or lat_max < self.lat0 or lat_min > lat_top:
+            return []
+        first_row, last_row = self._cell_rows(np.array([lat_min, lat_max]))
+        row_keys = np.arange(first_row, last_row + 1) * self.n_cols
+        runs = []
+        for lon_min, lon_max in lon_ranges:
+            if lon_max < self.lon0 or lon_min > lon_right:
+                continue
+            first_col, last_col = self._cell_cols(np.array([lon_min, lon_max]))
+            starts = np.searchsorted(self.keys, row_keys + first_col).tolist()
+            ends = np.searchsorted(self.keys, row_keys + last_col + 1).tolist()
+            runs += [(start, end) for start, end in zip(starts, ends) if end > start]
+        if len(lon_ranges) > 1:
+            # Ranges meeting at the antimeridian may share an edge cell
+            merged = []
+            for start, end in sorted(runs):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            runs = merged
+        return runs
+
+    @staticmethod
+    def _gather(values, runs):
+        # Concatenated runs of values; copying slices is far cheaper than
+        # fancy indexing the same positions
+        if len(runs) == 1:
+            return values[runs[0][0]:runs[0][1]]
+        return np.concatenate([values[start:end] for start, end in runs]) if runs else values[:0]
+
+    def _matching(self, runs, filters):
+        # Mask over the gathered runs of the stations matching every filter
+        # (True without filters): one lookup table per filter, -1 (missing)
+        # hits the False pad
+        mask = True
+        for name, wanted in filters.items():
+            if wanted is None:
+                continue
+            wanted = [wanted] if isinstance(wanted, str) else wanted
+            allowed = np.zeros(len(self.labels[name]) + 1, dtype=bool)
+            allowed[[self.labels[name].index(label) for label in wanted if label in self.labels[name]]] = True
+            mask = mask & allowed[self._gather(self.codes[name], runs)]
+        return mask
+
+    def _page(self, runs, mask, cosines, offset, limit, units):
+        # (distances, rows, total) of one page of the masked stations, closest
+        # (largest cosine) first; ties go by table row so pages never overlap
+        hits = np.flatnonzero(mask)
+        total = len(hits)
+        cosines = cosines[hits]
+        end = offset + limit
+        if end < total:
+            # Only the stations up to the page's last distance need sorting
+            keep = cosines >= -np.partition(-cosines, end - 1)[end - 1]
+            hits, cosines = hits[keep], cosines[keep]
+        rows = self._gather(self.rows, runs)[hits]
+        order = np.lexsort((rows, -cosines))[offset:end]
+        chords = np.sqrt(np.maximum(2 - 2 * cosines[order], 0))
+        return chord_to_distance(chords, units), rows[order], total
+
+    def radius(self, lat, lon, radius, units="mi", offset=0, limit=20, **filters):
+        # Stations within radius of (lat, lon) that match the filters, e.g.
+        # network="Tesla", level="DC Fast", access="Public"; a list matches
+        # any of its labels. Returns one page as (distances, rows, total).
+        # Distances are compared as cosines of the angle (one dot product per
+        # station), which order like the arc distance.
+        reach = np.degrees(radius / EARTH_RADIUS[units])
+        lon_reach = reach / max(np.cos(np.radians(min(abs(lat) + reach, 89.9))), 1e-6)
+        runs = self._runs(lat - reach, lat + reach, lon_ranges(lon - lon_reach, lon + lon_reach))
+        cosines = self._gather(self.points, runs) @ unit_vectors(lat, lon)
+        mask = (cosines >= 1 - distance_to_chord(radius, units) ** 2 / 2) & self._matching(runs, filters)
+        return self._page(runs, mask, cosines, offset, limit, units)
+
+    def box(self, lat_min, lat_max, lon_min, lon_max, center=None, units="mi", offset=0, limit=20, **filters):
+        # Stations inside the box that match the filters, by distance from
+        # center (default: the middle of the box); one page as in radius().
+        # lon_min > lon_max is a box across the antimeridian.
+        ranges = lon_ranges(lon_min, lon_max)
+        runs = self._runs(lat_min, lat_max, ranges)
+        lat, lon = self._gather(self.lat, runs), self._gather(self.lon, runs)
+        inside = np.zeros(len(lon), dtype=bool)
+        for low, high in ranges:
+            inside |= (lon >= low) & (lon <= high)
+        mask = inside & (lat >= lat_min) & (lat <= lat_max) & self._matching(runs, filters)
+        if center is None:
+            span = (lon_max - lon_min) % 360 if lon_max - lon_min < 360 else 360
+            center = ((lat_min + lat_max) / 2, wrap_longitude(lon_min + span / 2))
+        cosines = self._gather(self.points, runs) @ unit_vectors(*center)
+        return self._page(runs, mask, cosines, offset, limit, units)
+
+
+@traced()
+def load_grid_index(path=CSV_PATH, df=None):
+    return GridIndex.from_frame(load_stations(path) if df is None else df)
@@ -0,0 +1,183 @@
+'''
+Streaming (out-of-core) aggregation of the EV station export.
+
+The CSV is read in chunks sized to a memory budget, and every chunk updates a
+set of mergeable aggregators. The results match the in-memory path in
+ev_stations.py (load_stations + load_cube), but only one chunk is ever held
+in memory, so exports far larger than RAM can be summarized. Aggregators can
+also be merged, e.g. to combine several yearly or per-country exports.
+
+The budget covers the aggregators too: they keep sparse, label-keyed counts
+(the cube is built once, at the end), report their size, and each chunk gets
+what is left.
+
+Usage: python ev_stream.py [path/to/export.csv] [--memory-mb 256]
+'''
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from ev_cube import DIMS, MEASURES, StationCube, _narrow, _union_labels
+from ev_data import CSV_PATH, chunk_row_bytes, iter_station_chunks
+
+
+# Aggregators
+# Each aggregator has update(chunk), merge(other), result() and nbytes(), the
+# memory it needs between chunks.
+
+class ValueCounter:
+    # value_counts of one column, optionally within one state
+    def __init__(self, column, state=None):
+        self.column = column
+        self.state = state
+        self.counts = pd.Series(dtype="int64")
+
+    def update(self, chunk):
+        values = chunk[self.column]
+        if self.state is not None:
+            values = values[chunk["State"] == self.state]
+        counts = values.value_counts()
+        counts = counts[counts > 0]
+        counts.index = counts.index.astype(str)
+        self.counts = self.counts.add(counts, fill_value=0)
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0)
+
+    def result(self):
+        counts = self.counts.astype("int64").rename_axis(self.column).rename("count")
+        return counts.sort_values(ascending=False, kind="stable")
+
+    def nbytes(self):
+        return int(self.counts.memory_usage(deep=True))
+
+
+class CubeAggregator:
+    # State/network/owner/level/access/quarter counts and EVSE sums as sparse
+    # cells keyed by label. Every label gets a fixed code the first time it is
+    # seen, and a cell is its codes packed into one int64, CODE_BITS per
+    # dimension. Chunk cells are buffered and folded into the sorted cells once
+    # they outnumber them, so each cell is regrouped O(log n) times. The
+    # StationCube is built once, in result().
+    CODE_BITS = 10
+    MISSING = 2**CODE_BITS - 1  # Code of a missing value in every dimension
+    MIN_FOLD = 2**16  # Buffered cells before the first fold
+    # Peak bytes per cell while folding: the held keys and sums, their
+    # concatenation, np.unique's order, sorted copy and inverse, and one
+    # float64 measure at a time
+    FOLD_BYTES = 80
+
+    def __init__(self):
+        self.labels = {}  # {dim: labels seen so far, in cube order}
+        self.codes = {dim: {} for dim in DIMS}
+        self.keys = np.zeros(0, dtype=np.int64)
+        self.sums = np.zeros((len(MEASURES), 0), dtype=np.int8)
+        self.pending = []  # (keys, sums) of the chunks not folded in yet
+
+    def update(self, chunk):
+        self._add(StationCube.from_frame(chunk))
+
+    def merge(self, other):
+        self._add(other.result())
+
+    def _add(self, cube):
+        keys = np.zeros(len(cube), dtype=np.int64)
+        for axis, dim in enumerate(DIMS):
+            known = self.labels.get(dim)
+            if known is None or not known.equals(cube.labels[dim]):
+                self.labels[dim] = cube.labels[dim] if known is None else _union_labels(dim, known, cube.labels[dim])
+            codes = self.codes[dim]
+            for label in cube.labels[dim]:
+                codes.setdefault(label, len(codes))
+            if len(codes) > self.MISSING:
+                raise ValueError(f"More than {self.MISSING} labels for {dim}")
+            table = np.array([codes[label] for label in cube.labels[dim]] + [self.MISSING], dtype=np.int64)
+            keys |= table[cube.cells[axis]] << (axis * self.CODE_BITS)
+
+        self.pending.append((keys, np.array([cube.measures[name] for name in MEASURES])))
+        if self._pending_cells() >= max(len(self.keys), self.MIN_FOLD):
+            self._fold()
+
+    def _pending_cells(self):
+        return sum(len(keys) for keys, _ in self.pending)
+
+    def _fold(self):
+        keys, inverse = np.unique(np.concatenate([self.keys] + [keys for keys, _ in self.pending]),
+                                  return_inverse=True)
+        sums = [_narrow(np.bincount(inverse, minlength=len(keys),
+                                    weights=np.concatenate([self.sums[i]] + [sums[i] for _, sums in self.pending])
+                                    .astype("float64")))
+                for i in range(len(MEASURES))]
+        self.keys, self.sums, self.pending = keys, np.array(sums), []
+
+    def result(self):
+        if self.pending:
+            self._fold()
+        labels = {dim: self.labels.get(dim, pd.PeriodIndex([], freq="Q") if dim == "Open Quarter" else pd.Index([]))
+                  for dim in DIMS}
+        cells = []
+        for axis, dim in enumerate(DIMS):
+            seen = list(self.codes[dim])
+            seen = pd.PeriodIndex(seen, freq="Q") if dim == "Open Quarter" else pd.Index(seen)
+            table = np.full(self.MISSING + 1, len(labels[dim]), dtype=np.int64)
+            table[:len(seen)] = labels[dim].get_indexer(seen)
+            cells.append(table[(self.keys >> (axis * self.CODE_BITS)) & self.MISSING])
+        return StationCube(labels, _narrow(cells), dict(zip(MEASURES, self.sums)))
+
+    def nbytes(self):
+        # Peak of the next fold, which the held and buffered cells add up to
+        return self.FOLD_BYTES * (len(self.keys) + self._pending_cells())
+
+
+def default_aggregators():
+    return {
+        "cube": CubeAggregator(),
+        "city": ValueCounter("City"),
+        "facility_type": ValueCounter("Facility Type"),
+        "ca_county": ValueCounter("County", state="CA"),
+    }
+
+
+# Streaming
+
+def stream_aggregates(path=CSV_PATH, memory_mb=256, aggregators=None):
+    # Each chunk gets the budget minus what the aggregators hold by then
+    aggregators = default_aggregators() if aggregators is None else aggregators
+    row_bytes = chunk_row_bytes(path)
+
+    def next_chunksize():
+        held = sum(aggregator.nbytes() for aggregator in aggregators.values())
+        return max(1000, int((memory_mb * 2**20 - held) / row_bytes))
+
+    rows = 0
+    for chunk in iter_station_chunks(path, next_chunksize):
+        rows += len(chunk)
+        for aggregator in aggregators.values():
+            aggregator.update(chunk)
+        del chunk
+    return aggregators, rows
+
+
+def merge_aggregates(*aggregator_sets):
+    merged = aggregator_sets[0]
+    for aggregators in aggregator_sets[1:]:
+        for name, aggregator in aggregators.items():
+            merged[name].merge(aggregator)
+    return merged
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a station export without loading it into memory")
+    parser.add_argument("path", nargs="?", default=CSV_PATH)
+    parser.add_argument("--memory-mb", type=int, default=256)
+    args = parser.parse_args()
+
+    aggregators, rows = stream_aggregates(args.path, args.memory_mb)
+    cube = aggregators["cube"].result()
+    print(f"{rows} stations")
+    print(cube.counts("State").head(10).to_string())
+    print(aggregators["city"].result().head(10).to_string())
+    print(aggregators["facility_type"].result().head(10).to_string())
+    print(aggregators["ca_county"].result().head(10).to_string())
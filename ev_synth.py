@@ -0,0 +1,175 @@
+'''
+Synthetic station exports for benchmarks.
+
+generate_stations(n) returns a table with the columns and raw value formats
+of ev_stations_v1.csv. Stations are clustered around real city centres
+(weighted by city size, with a rural share spread around each state), ZIPs
+follow the city's ZIP prefix, and the network, charger level, access, owner
+and facility mixes as well as the opening dates (growing towards recent
+years) follow the shape of the AFDC export. A small share of rows carries the
+same junk as the export (ZIP+4 strings, text in Longitude, missing
+coordinates and dates) so the cleaning code does real work.
+
+write_stations_csv(path, n) writes the table in chunks, so 10M-row files can
+be produced without holding them in memory.
+
+Usage: python ev_synth.py 1000000 [--out synthetic_1000000.csv] [--seed 0]
+'''
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# (city, state, lat, lon, ZIP3 prefix, weight)
+CITIES = [
+    ("Los Angeles", "CA", 34.05, -118.24, 900, 10.0),
+    ("San Francisco", "CA", 37.77, -122.42, 941, 6.0),
+    ("San Jose", "CA", 37.34, -121.89, 951, 5.0),
+    ("San Diego", "CA", 32.72, -117.16, 921, 5.0),
+    ("Sacramento", "CA", 38.58, -121.49, 958, 3.0),
+    ("Irvine", "CA", 33.68, -117.83, 926, 3.0),
+    ("Fresno", "CA", 36.74, -119.79, 937, 1.5),
+    ("Oakland", "CA", 37.80, -122.27, 946, 2.5),
+    ("Seattle", "WA", 47.61, -122.33, 981, 3.5),
+    ("Portland", "OR", 45.52, -122.68, 972, 2.5),
+    ("Denver", "CO", 39.74, -104.99, 802, 3.0),
+    ("Phoenix", "AZ", 33.45, -112.07, 850, 2.5),
+    ("Las Vegas", "NV", 36.17, -115.14, 891, 1.5),
+    ("Salt Lake City", "UT", 40.76, -111.89, 841, 1.5),
+    ("Austin", "TX", 30.27, -97.74, 787, 2.5),
+    ("Dallas", "TX", 32.78, -96.80, 752, 3.0),
+    ("Houston", "TX", 29.76, -95.37, 770, 3.0),
+    ("Chicago", "IL", 41.88, -87.63, 606, 3.5),
+    ("Minneapolis", "MN", 44.98, -93.27, 554, 1.5),
+    ("Columbus", "OH", 39.96, -83.00, 432, 1.5),
+    ("Detroit", "MI", 42.33, -83.05, 482, 1.5),
+    ("Atlanta", "GA", 33.75, -84.39, 303, 3.0),
+    ("Miami", "FL", 25.76, -80.19, 331, 3.0),
+    ("Orlando", "FL", 28.54, -81.38, 328, 2.0),
+    ("Tampa", "FL", 27.95, -82.46, 336, 1.5),
+    ("Charlotte", "NC", 35.23, -80.84, 282, 1.5),
+    ("Raleigh", "NC", 35.78, -78.64, 276, 1.5),
+    ("Washington", "DC", 38.91, -77.04, 200, 2.5),
+    ("Baltimore", "MD", 39.29, -76.61, 212, 1.5),
+    ("Philadelphia", "PA", 39.95, -75.17, 191, 2.0),
+    ("New York", "NY", 40.71, -74.01, 100, 5.0),
+    ("Newark", "NJ", 40.74, -74.17, 71, 2.0),
+    ("Boston", "MA", 42.36, -71.06, 21, 3.5),
+    ("Burlington", "VT", 44.48, -73.21, 54, 0.5),
+    ("Anchorage", "AK", 61.22, -149.90, 995, 0.2),
+    ("Honolulu", "HI", 21.31, -157.86, 968, 0.8),
+]
+
+# (value, share) mixes, in the spirit of the AFDC export
+NETWORKS = [
+    ("ChargePoint Network", 0.42), ("Non-Networked", 0.15), ("Tesla Destination", 0.07), ("Tesla", 0.05),
+    ("Blink Network", 0.06), ("SHELL_RECHARGE", 0.05), ("EVgo", 0.03), ("Electrify America", 0.02),
+    ("FLO", 0.02), ("EV Connect", 0.03), ("Volta", 0.02), ("AMPUP", 0.02), ("CHARGELAB", 0.01),
+    ("SEMACONNECT", 0.02), ("EVCS", 0.01), ("FPLEV", 0.01), ("RIVIAN_WAYPOINTS", 0.01),
+]
+ACCESS = [("Public", 0.86), ("Private", 0.10), ("Public - Call ahead", 0.02),
+          ("Public - Card key at all times", 0.01), ("Private - Government only", 0.01)]
+OWNERS = [("P", 0.55), ("LG", 0.06), ("SG", 0.03), ("FG", 0.01), ("T", 0.02), ("J", 0.01), (None, 0.32)]
+FACILITIES = [("PARKING_LOT", 0.12), ("HOTEL", 0.06), ("CAR_DEALER", 0.08), ("MUNI_GOV", 0.04),
+              ("SHOPPING_CENTER", 0.04), ("OFFICE_BLDG", 0.03), ("GROCERY", 0.03), ("LIBRARY", 0.02),
+              ("PARKING_GARAGE", 0.04), ("PAY_GARAGE", 0.02), (None, 0.52)]
+
+# Charger level mix: DC fast sites, level 2 sites (some with a level 1 port)
+# and the odd level 1 only site
+LEVEL_SHARES = {"dc": 0.14, "level2": 0.83, "level1": 0.03}
+
+FIRST_OPEN, LAST_OPEN = pd.Timestamp("1995-01-01"), pd.Timestamp("2024-12-31")
+RURAL_SHARE = 0.15
+JUNK_SHARE = 0.002
+
+COLUMNS = ["Fuel Type Code", "Station Name", "Street Address", "City", "State", "ZIP", "Status Code",
+           "Groups With Access Code", "EV Level1 EVSE Num", "EV Level2 EVSE Num", "EV DC Fast Count",
+           "EV Network", "Latitude", "Longitude", "ID", "Owner Type Code", "Open Date", "Facility Type", "Country"]
+
+
+def _choice(rng, mix, n):
+    values, shares = zip(*mix)
+    shares = np.asarray(shares, dtype="float64")
+    return np.asarray(values, dtype=object)[rng.choice(len(values), n, p=shares / shares.sum())]
+
+
+def _evse_counts(rng, n):
+    # (level 1, level 2, DC fast) port counts as float columns with NaN for
+    # none, like the export
+    kind = rng.choice(3, n, p=[LEVEL_SHARES["dc"], LEVEL_SHARES["level2"], LEVEL_SHARES["level1"]])
+    level1 = np.where((kind == 2) | ((kind == 1) & (rng.random(n) < 0.02)), rng.integers(1, 4, n), 0)
+    level2 = np.where((kind == 1) | ((kind == 0) & (rng.random(n) < 0.2)), rng.geometric(0.4, n), 0)
+    dc = np.where(kind == 0, rng.geometric(0.2, n), 0)
+    return tuple(np.where(ports > 0, ports, np.nan) for ports in (level1, level2, dc))
+
+
+def _open_dates(rng, n):
+    # Openings grow roughly exponentially towards the last years
+    span = (LAST_OPEN - FIRST_OPEN).days
+    days = span - np.minimum(rng.exponential(span / 5, n), span)
+    return (FIRST_OPEN + pd.to_timedelta(days.astype(np.int64), unit="D")).strftime("%Y-%m-%d")
+
+
+def generate_stations(n, seed=0, first_id=1):
+    rng = np.random.default_rng(seed)
+    names, states, lat0, lon0, zip3, weight = (np.asarray(column) for column in zip(*CITIES))
+    city = rng.choice(len(CITIES), n, p=weight / weight.sum())
+
+    # Urban stations within a few miles of the centre, rural ones spread
+    # over the surrounding region
+    spread = np.where(rng.random(n) < RURAL_SHARE, 1.2, 0.08)
+    lat = lat0[city] + rng.normal(0, 1, n) * spread
+    lon = lon0[city] + rng.normal(0, 1, n) * spread / np.cos(np.radians(lat0[city]))
+    zips = zip3[city] * 100 + rng.integers(0, 100, n)
+    level1, level2, dc = _evse_counts(rng, n)
+    ids = np.arange(first_id, first_id + n)
+
+    df = pd.DataFrame({
+        "Fuel Type Code": "ELEC",
+        "Station Name": pd.Series(ids).map("Station {}".format),
+        "Street Address": pd.Series(rng.integers(1, 20000, n)).map("{} Main St".format),
+        "City": names[city],
+        "State": states[city],
+        "ZIP": pd.Series(zips).map("{:05d}".format),
+        "Status Code": "E",
+        "Groups With Access Code": _choice(rng, ACCESS, n),
+        "EV Level1 EVSE Num": level1,
+        "EV Level2 EVSE Num": level2,
+        "EV DC Fast Count": dc,
+        "EV Network": _choice(rng, NETWORKS, n),
+        "Latitude": lat.round(6),
+        "Longitude": lon.round(6).astype(object),
+        "ID": ids,
+        "Owner Type Code": _choice(rng, OWNERS, n),
+        "Open Date": _open_dates(rng, n),
+        "Facility Type": _choice(rng, FACILITIES, n),
+        "Country": "US",
+    }, columns=COLUMNS)
+
+    # Export junk: ZIP+4, text in Longitude, missing coordinates and dates
+    junk = np.flatnonzero(rng.random(n) < JUNK_SHARE)
+    kinds = rng.integers(0, 4, len(junk))
+    df.loc[junk[kinds == 0], "ZIP"] = df["ZIP"].iloc[junk[kinds == 0]] + "-1234"
+    df.loc[junk[kinds == 1], "Longitude"] = "bad"
+    df.loc[junk[kinds == 2], ["Latitude", "Longitude"]] = np.nan
+    df.loc[junk[kinds == 3], "Open Date"] = np.nan
+    return df
+
+
+def write_stations_csv(path, n, seed=0, chunksize=1_000_000):
+    # Chunk i draws from seed + i, so the same arguments give the same file
+    for i, start in enumerate(range(0, n, chunksize)):
+        chunk = generate_stations(min(chunksize, n - start), seed=seed + i, first_id=start + 1)
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic station export")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--out", help="CSV path (default: synthetic_<rows>.csv)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(write_stations_csv(args.out or f"synthetic_{args.rows}.csv", args.rows, args.seed))
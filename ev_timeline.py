@@ -0,0 +1,201 @@
+'''
+Installed-capacity time series over the station opening dates.
+
+Timeline keeps the dated stations sorted by Open Day (integer day numbers,
+see parse_open_days in ev_data) with their group codes and EVSE counts. For
+a grouping (any combination of State, EV Network, County, ...) the stations
+are stably re-sorted by group once, so each group is a run of ascending
+days, and running sums of the ports per level are kept next to them. What
+was installed in a group as of a day is then the difference of two running
+sums at searchsorted positions: O(log n) per (day, group), vectorized over
+days and groups, so a timeline can be scrubbed without touching the table.
+Openings per quarter or year are differences of the installed totals at the
+period ends.
+
+    timeline = load_timeline()
+    timeline.installed("2020-06-30")                                # US totals
+    timeline.installed("2020-06-30", by="State")                    # per state
+    timeline.installed("2020-06-30", by="EV Network", where={"State": "CA"})
+    timeline.installed(["2019-12-31", "2020-12-31"], by="State", measure="EV DC Fast Count")
+    timeline.openings("Y", by="Charger Type")
+
+Stations without an Open Date have no place on the timeline and are only
+counted in `undated`.
+'''
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from ev_cube import EVSE_COLUMNS, MEASURES
+from ev_data import CSV_PATH, NO_DAY, cache_path, county_version, load_stations, open_days, prune_cache
+from ev_trace import traced
+
+DIMS = ["State", "EV Network", "Owner Type Code", "Facility Type", "Charger Type", "Access Type", "County"]
+
+
+def day_numbers(dates):
+    # Dates (strings, Timestamps, datetime64) to int64 days since 1970-01-01
+    return pd.to_datetime(np.atleast_1d(dates)).to_numpy(dtype="datetime64[D]").astype(np.int64)
+
+
+class Timeline:
+    def __init__(self, days, codes, labels, ports, undated=0):
+        # days: sorted int32 Open Day per dated station; codes: {dim: codes
+        # aligned with days, -1 when missing}; labels: {dim: [names]};
+        # ports: {EVSE column: int32 counts aligned with days}
+        self.days = days
+        self.codes = codes
+        self.labels = labels
+        self.ports = ports
+        self.undated = undated
+        self._groupings = {}
+
+    def __len__(self):
+        return len(self.days)
+
+    @classmethod
+    @traced()
+    def from_frame(cls, df):
+        days = open_days(df)
+        dated = np.flatnonzero(days != NO_DAY)
+        rows = dated[np.argsort(days[dated], kind="stable")]
+        codes, labels = {}, {}
+        for dim in DIMS:
+            if dim in df.columns:
+                values = df[dim].astype("category")
+                codes[dim] = values.cat.codes.to_numpy()[rows].astype(np.int32)
+                labels[dim] = [str(label) for label in values.cat.categories]
+        ports = {column: df[column].to_numpy(dtype="int32", na_value=0)[rows] for column in EVSE_COLUMNS}
+        return cls(days[rows].astype(np.int32), codes, labels, ports, undated=len(df) - len(rows))
+
+    # Persistence
+
+    def save(self, target):
+        arrays = {"days": self.days, "undated": np.array(self.undated)}
+        arrays.update({f"ports:{column}": values for column, values in self.ports.items()})
+        arrays.update({f"codes:{dim}": values for dim, values in self.codes.items()})
+        arrays.update({f"labels:{dim}": np.array(labels, dtype=str) for dim, labels in self.labels.items()})
+        np.savez(target, **arrays)
+
+    @classmethod
+    def load(cls, target):
+        with np.load(target) as data:
+            def part(prefix):
+                return {key.split(":", 1)[1]: data[key] for key in data.files if key.startswith(prefix)}
+            labels = {dim: [str(label) for label in values] for dim, values in part("labels:").items()}
+            return cls(data["days"], part("codes:"), labels, part("ports:"), int(data["undated"]))
+
+    # Groupings
+
+    def _grouping(self, by, where):
+        # (keys, running sums, group labels, day0, span) for the stations
+        # matching where, grouped by the dims in by. keys are group * span +
+        # day offset, ascending; running sums start with 0 so sums[j] -
+        # sums[i] covers stations i..j-1. Stations with a missing label in
+        # one of the dims are left out.
+        cache_key = (by, tuple(sorted(where.items())))
+        if cache_key not in self._groupings:
+            day0 = int(self.days[0]) if len(self.days) else 0
+            span = int(self.days[-1]) - day0 + 1 if len(self.days) else 1
+            keep = np.ones(len(self.days), dtype=bool)
+            for dim, values in where.items():
+                allowed = [self.labels[dim].index(value) for value in values if value in self.labels[dim]]
+                keep &= np.isin(self.codes[dim], allowed)
+            for dim in by:
+                keep &= self.codes[dim] >= 0
+            keep = np.flatnonzero(keep)
+
+            if by:
+                shape = tuple(len(self.labels[dim]) for dim in by)
+                flat = np.ravel_multi_index([self.codes[dim][keep] for dim in by], shape)
+                present, group = np.unique(flat, return_inverse=True)
+                # Days are already ascending, so a stable sort by group keeps
+                # them ascending within each group
+                order = np.argsort(group, kind="stable")
+                keys = group[order] * span + (self.days[keep[order]].astype(np.int64) - day0)
+                order = keep[order]
+                names = [[self.labels[dim][i] for i in positions]
+                         for dim, positions in zip(by, np.unravel_index(present, shape))]
+                labels = (pd.MultiIndex.from_arrays(names, names=list(by)) if len(by) > 1
+                          else pd.Index(names[0], name=by[0]))
+            else:
+                order = keep
+                keys = self.days[keep].astype(np.int64) - day0
+                labels = pd.Index(["US"])
+
+            sums = {"count": np.arange(len(order) + 1, dtype=np.int64)}
+            for column, values in self.ports.items():
+                sums[column] = np.concatenate([[0], np.cumsum(values[order], dtype=np.int64)])
+            self._groupings[cache_key] = (keys, sums, labels, day0, span)
+        return self._groupings[cache_key]
+
+    # Queries
+
+    def installed(self, dates, by=None, measure=None, where=None):
+        # Stations ("count") and EVSE ports opened up to and including each
+        # date. by: dim or dims to group by; where: {dim: value or values}.
+        # A single date gives one row per group (a Series over the measures
+        # without by); several dates give one row per date, per group with
+        # by (then for one measure, "count" by default).
+        by = (by,) if isinstance(by, str) else tuple(by or ())
+        where = {dim: tuple(np.atleast_1d(values)) for dim, values in (where or {}).items()}
+        keys, sums, labels, day0, span = self._grouping(by, where)
+
+        # Runs of each group are [start, end) in keys; per date, the end moves
+        # to the last station opened on or before it
+        offsets = np.clip(day_numbers(dates) - day0, -1, span - 1)
+        groups = np.arange(len(labels), dtype=np.int64) * span
+        starts = np.searchsorted(keys, groups, side="left")[None, :]
+        ends = np.searchsorted(keys, groups[None, :] + offsets[:, None], side="right")
+
+        many = np.ndim(dates) > 0
+        if many and by and measure is None:
+            measure = "count"
+        measures = [measure] if measure is not None else MEASURES
+        values = {name: sums[name][ends] - sums[name][starts] for name in measures}
+
+        if many:
+            index = pd.DatetimeIndex(pd.to_datetime(np.atleast_1d(dates)), name="Date")
+            if by:
+                return pd.DataFrame(values[measure], index=index, columns=labels)
+            frame = pd.DataFrame({name: table[:, 0] for name, table in values.items()}, index=index)
+            return frame[measure] if measure is not None else frame
+        if by:
+            frame = pd.DataFrame({name: table[0] for name, table in values.items()}, index=labels)
+            return frame[measure] if measure is not None else frame
+        totals = pd.Series({name: int(table[0, 0]) for name, table in values.items()})
+        return totals[measure] if measure is not None else totals
+
+    def date_span(self):
+        # (first, last) Open Date on the timeline
+        if not len(self.days):
+            return None
+        return tuple(pd.Timestamp(np.datetime64(int(day), "D")) for day in (self.days[0], self.days[-1]))
+
+    def openings(self, freq="Q", by=None, measure="count", where=None):
+        # Openings per quarter ("Q") or year ("Y") from the first to the last
+        # opening, every period included; one column per group with by
+        span = self.date_span()
+        if span is None:
+            return pd.Series(dtype=np.int64)
+        periods = pd.period_range(*span, freq=freq)
+        ends = periods.end_time.normalize()
+        installed = self.installed(list(ends), by=by, measure=measure, where=where)
+        opened = installed.diff()
+        opened.iloc[0] = installed.iloc[0]
+        opened.index = periods
+        return opened.astype(np.int64)
+
+
+@traced()
+def load_timeline(path=CSV_PATH, df=None):
+    # County is a timeline dimension, so the county sources are part of the key
+    target = cache_path(path, "timeline", f".{county_version()}.npz")
+    if os.path.exists(target):
+        return Timeline.load(target)
+    timeline = Timeline.from_frame(load_stations(path) if df is None else df)
+    timeline.save(target)
+    prune_cache(path, "timeline", keep=target)
+    return timeline
@@ -0,0 +1,243 @@
+'''
+Per-stage timing and memory instrumentation.
+
+Pipeline stages are wrapped in stage() blocks or @traced functions. While
+tracing is on, each stage records its wall time, CPU time, peak resident set
+(high-water mark during the stage, Linux only) and row count, plus the peak
+of Python/numpy allocations when tracemalloc is on. Nested stages are kept
+with their depth, and a parent's peak includes its children's.
+
+Tracing is off by default. Then stage() hands back a shared no-op and
+@traced calls straight through, which costs one attribute check. Turn it on
+at runtime with enable(), or for a whole process with the EV_TRACE
+environment variable, which also writes the trace at exit:
+
+    EV_TRACE=trace.json python ev_stations.py       # Chrome trace-event format
+    EV_TRACE=trace.jsonl streamlit run search_app.py  # one JSON object per stage
+
+EV_TRACE_TRACEMALLOC=1 adds the tracemalloc peaks.
+
+Chrome traces open in chrome://tracing or https://ui.perfetto.dev.
+'''
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+
+# Memory
+
+def _status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    return 0
+
+
+def _reset_peak_rss():
+    # Reset VmHWM to the current RSS (Linux 4.0+)
+    with open(_CLEAR_REFS, "w") as f:
+        f.write("5")
+
+
+def can_measure_rss():
+    try:
+        _reset_peak_rss()
+        return _status_kb("VmHWM") > 0
+    except OSError:
+        return False
+
+
+# Stages
+
+class Stage:
+    def __init__(self, tracer, name, rows, args):
+        self.tracer = tracer
+        self.name = name
+        self.rows = rows
+        self.args = args
+
+    def __enter__(self):
+        tracer = self.tracer
+        stack = tracer._stack()
+        parent = stack[-1] if stack else None
+        self.depth = len(stack)
+        # Peaks are process-wide, so fold the running peak into the parent
+        # before resetting it for this stage
+        if tracer.rss:
+            if parent is not None:
+                parent._peak_kb = max(parent._peak_kb, _status_kb("VmHWM"))
+            _reset_peak_rss()
+            self._start_kb = self._peak_kb = _status_kb("VmRSS")
+        if tracer.tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent._peak_traced = max(parent._peak_traced, peak)
+            tracemalloc.reset_peak()
+            self._start_traced = self._peak_traced = current
+        stack.append(self)
+        self._cpu = time.process_time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        cpu = time.process_time_ns() - self._cpu
+        tracer = self.tracer
+        stack = tracer._stack()
+        stack.pop()
+        parent = stack[-1] if stack else None
+
+        event = {"name": self.name, "start": (self._start - tracer.epoch) / 1e9, "wall_s": (end - self._start) / 1e9,
+                 "cpu_s": cpu / 1e9, "depth": self.depth, "pid": os.getpid(), "tid": threading.get_ident()}
+        if self.rows is not None:
+            event["rows"] = int(self.rows)
+        if tracer.rss:
+            self._peak_kb = max(self._peak_kb, _status_kb("VmHWM"))
+            if parent is not None:
+                parent._peak_kb = max(parent._peak_kb, self._peak_kb)
+            event["peak_mb"] = round(self._peak_kb / 1024, 1)
+            event["stage_mb"] = round((self._peak_kb - self._start_kb) / 1024, 1)
+        if tracer.tracemalloc:
+            self._peak_traced = max(self._peak_traced, tracemalloc.get_traced_memory()[1])
+            if parent is not None:
+                parent._peak_traced = max(parent._peak_traced, self._peak_traced)
+            event["traced_mb"] = round((self._peak_traced - self._start_traced) / 2**20, 1)
+        if exc[0] is not None:
+            event["error"] = exc[0].__name__
+        event.update(self.args)
+        tracer.events.append(event)
+        return False
+
+
+class _NullStage:
+    # Returned while tracing is off; rows can still be set on it
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self.rss = False
+        self.tracemalloc = False
+        self.events = []
+        self.epoch = time.perf_counter_ns()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enable(self, memory=True, use_tracemalloc=False):
+        # memory: record the peak RSS per stage where the platform allows it.
+        # use_tracemalloc also records Python/numpy allocation peaks, at a
+        # real cost to allocation-heavy code.
+        self.rss = memory and can_measure_rss()
+        if use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.tracemalloc = use_tracemalloc
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self.tracemalloc:
+            tracemalloc.stop()
+            self.tracemalloc = False
+
+    def clear(self):
+        self.events = []
+        self.epoch = time.perf_counter_ns()
+
+    def stage(self, name, rows=None, **args):
+        if not self.enabled:
+            return _NULL
+        return Stage(self, name, rows, args)
+
+    # Export
+
+    def write_jsonl(self, path):
+        with open(path, "w") as f:
+            f.writelines(json.dumps(event) + "\n" for event in self.events)
+
+    def write_chrome_trace(self, path):
+        # Complete ("X") events in microseconds; the measurements go in args
+        skip = {"name", "start", "wall_s", "pid", "tid"}
+        trace = [{"name": event["name"], "cat": "ev", "ph": "X", "ts": event["start"] * 1e6,
+                  "dur": event["wall_s"] * 1e6, "pid": event["pid"], "tid": event["tid"],
+                  "args": {key: value for key, value in event.items() if key not in skip}}
+                 for event in self.events]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def export(self, path):
+        # Chrome trace for .json, JSON lines otherwise
+        if path.endswith(".json"):
+            self.write_chrome_trace(path)
+        else:
+            self.write_jsonl(path)
+        return path
+
+
+TRACER = Tracer()
+
+
+def enable(memory=True, use_tracemalloc=False):
+    TRACER.enable(memory, use_tracemalloc)
+
+
+def disable():
+    TRACER.disable()
+
+
+def stage(name, rows=None, **args):
+    # with stage("read_csv") as s: df = ...; s.rows = len(df)
+    return TRACER.stage(name, rows, **args)
+
+
+def traced(name=None):
+    # Decorator form of stage(). DataFrame and array results set the row
+    # count.
+    def decorate(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            with TRACER.stage(stage_name) as s:
+                result = func(*args, **kwargs)
+                if hasattr(result, "shape") and hasattr(result, "__len__"):
+                    s.rows = len(result)
+                return result
+        return wrapper
+    return decorate
+
+
+def export(path):
+    return TRACER.export(path)
+
+
+if os.environ.get("EV_TRACE"):
+    enable(use_tracemalloc=os.environ.get("EV_TRACE_TRACEMALLOC") == "1")
+    atexit.register(export, os.environ["EV_TRACE"])
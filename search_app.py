@@ -0,0 +1,95 @@
+'''
+EV Charging Station Search (Postal Code Search by Ken Ning), as its own
+Streamlit app so it does not re-run the batch report on every keystroke.
+
+Run with: streamlit run search_app.py
+
+The station table and its indexes are built once per server process and
+cached by the dataset version (only the latest is kept), so each rerun only
+does the lookups. The nearest-station KD-tree (and scipy) is only loaded by
+the first nearest-station query.
+Loading and every search are traced when EV_TRACE is set (see ev_trace.py).
+'''
+
+import streamlit as st
+
+from ev_data import CSV_PATH, data_version, load_stations
+from ev_search import FILTERS, ZipIndex, load_grid_index, load_station_index, search_results
+from ev_trace import stage
+
+
+@st.cache_resource(show_spinner="Loading charging stations...", max_entries=1)
+def load_search_state(path, version):
+    # version is only part of the cache key: a new export loads fresh indexes
+    # and, with max_entries=1, drops the previous ones
+    with stage("load_search_state"):
+        df = load_stations(path)
+        return df, ZipIndex.from_frame(df), load_station_index(path, df), load_grid_index(path, df)
+
+
+df, zip_index, station_index, grid_index = load_search_state(CSV_PATH, data_version(CSV_PATH))
+
+st.title("EV Charging Station Search")
+zip_code = st.text_input("Input your postal code (ZIP Code)", "")
+
+if zip_code:
+    with stage("zip_search", query=zip_code) as s:
+        zip_rows = zip_index.rows_for(zip_code)
+        zip_results = search_results(df, zip_rows)
+        s.rows = len(zip_rows)
+    # ZIPs without stations are placed by their ZIP3 prefix
+    centroid = station_index.zip_centroid(zip_code)
+
+    if len(zip_rows):
+        city, state = df.iloc[zip_rows[0]][['City', 'State']]
+        st.write(f"Postal code {zip_code} belongs to {city}, {state}.")
+
+        st.write("The charging stations in this postal code are as follows:")
+        st.dataframe(zip_results)
+    elif centroid is not None:
+        st.write(f"No charging station has postal code {zip_code}.")
+
+    if centroid is not None:
+        with stage("nearest_search", query=zip_code) as s:
+            distances, rows = station_index.nearest(*centroid, k=10)
+            nearby_stations = search_results(df, rows, distances)
+            s.rows = len(rows)
+
+        if not nearby_stations.empty:
+            st.write("The nearest charging stations are as follows:")
+            st.dataframe(nearby_stations)
+        else:
+            st.write("No charging station information found in the nearby area.")
+    else:
+        st.write("Postal code not found.")
+
+st.header("Stations near a location")
+location = st.text_input("ZIP Code or latitude, longitude", "")
+radius = st.number_input("Radius (mi)", min_value=0.1, max_value=200.0, value=10.0)
+filters = {name: st.multiselect(column, grid_index.labels[name]) for name, column in FILTERS.items()}
+page = st.number_input("Page", min_value=1, value=1)
+
+if location:
+    if "," in location:
+        try:
+            center = tuple(float(part) for part in location.split(","))
+        except ValueError:
+            center = None
+        center = center if center is not None and len(center) == 2 else None
+    else:
+        center = station_index.zip_centroid(location)
+
+    if center is None:
+        st.write("Location not found.")
+    else:
+        with stage("radius_search", query=location) as s:
+            distances, rows, total = grid_index.radius(*center, radius, offset=(page - 1) * 20, limit=20,
+                                                       **{name: values or None for name, values in filters.items()})
+            radius_results = search_results(df, rows, distances)
+            s.rows = total
+
+        if total:
+            st.write(f"{total} charging stations within {radius:g} mi, showing {len(rows)} from page {page}:")
+            st.dataframe(radius_results)
+        else:
+            st.write("No charging station matches within this radius.")